@@ -0,0 +1,266 @@
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from Logic import ALGORITHMS, GOAL_STATE, INFORMED, get_board, get_heuristic, solution_time
+
+# Random solvable 15-puzzle boards (generate_instances(10, seed=15, size=4)) with
+# their optimal solution lengths.
+FIFTEEN_PUZZLE = [
+    ([[9, 4, 7, 10], [1, 5, 15, 13], [12, 3, 2, 14], [11, 8, 0, 6]], 53),
+    ([[14, 8, 0, 9], [2, 1, 15, 3], [12, 13, 6, 4], [5, 11, 7, 10]], 48),
+    ([[8, 0, 15, 11], [2, 4, 14, 5], [10, 1, 12, 6], [7, 9, 3, 13]], 51),
+    ([[9, 6, 5, 10], [1, 12, 7, 4], [14, 11, 8, 2], [3, 0, 13, 15]], 48),
+    ([[9, 13, 0, 2], [5, 10, 14, 3], [12, 6, 4, 8], [11, 7, 15, 1]], 54),
+    ([[14, 1, 8, 3], [13, 0, 12, 15], [11, 7, 6, 5], [10, 2, 4, 9]], 50),
+    ([[9, 5, 13, 8], [2, 7, 3, 12], [10, 11, 1, 4], [0, 14, 6, 15]], 45),
+    ([[12, 10, 5, 2], [13, 4, 6, 3], [11, 9, 1, 7], [14, 8, 0, 15]], 45),
+    ([[7, 9, 1, 3], [2, 8, 4, 14], [13, 11, 6, 10], [12, 5, 15, 0]], 44),
+    ([[4, 7, 9, 3], [8, 2, 1, 11], [12, 5, 10, 0], [6, 15, 14, 13]], 57),
+]
+
+# Frozen 3x3 corpus: optimal depth -> boards read row by row. Every depth from 0 to
+# 31 is covered (31 is the diameter of the 8-puzzle, and it has only these two).
+CORPUS = {
+    0: ["123456780"],
+    1: ["123450786", "123456708"],
+    2: ["123405786", "123456078"],
+    3: ["103425786", "103426758"],
+    4: ["123468750", "123506478"],
+    5: ["203145786", "203156478"],
+    6: ["023185476", "123746580"],
+    7: ["243150786", "513026478"],
+    8: ["235104786", "253176048"],
+    9: ["102743586", "123058467"],
+    10: ["026134758", "283175460"],
+    11: ["103726854", "106435782"],
+    12: ["230174865", "420715863"],
+    13: ["106325478", "423751806"],
+    14: ["264108735", "610423758"],
+    15: ["185072643", "623714508"],
+    16: ["162503847", "512687430"],
+    17: ["531782406", "532017486"],
+    18: ["012876453", "243681750"],
+    19: ["403216875", "863247105"],
+    20: ["368512470", "581302647"],
+    21: ["183425607", "507283416"],
+    22: ["710436528", "751826340"],
+    23: ["167250834", "524087136"],
+    24: ["567382014", "850643127"],
+    25: ["206845713", "402637581"],
+    26: ["371254068", "478162350"],
+    27: ["217650834", "605437128"],
+    28: ["064835721", "632154870"],
+    29: ["651084327", "867045132"],
+    30: ["021864357", "047586123"],
+    31: ["647850321", "867254301"],
+}
+
+METRICS = ["median_ns", "p95_ns", "nodes", "peak_bytes", "extra_moves"]
+
+# Metrics that depend on which entrant wins a race, and so change from run to run of the
+# same code; compare leaves them out. Every portfolio_optimal entrant is optimal, so only
+# its node count varies.
+RACES = {"portfolio": {"nodes", "extra_moves", "optimal"}, "portfolio_optimal": {"nodes"}}
+
+
+def run_fifteen_puzzle(algo_type="ida_star", heuristic=None):
+    total = 0
+    for number, (state, optimal) in enumerate(FIFTEEN_PUZZLE):
+        solution, execution_time, _ = solution_time(state, algo_type, heuristic)
+        moves = len(solution) - 1 if solution else None
+        total += execution_time
+        print(f"#{number}: {moves} moves (optimal {optimal}) in {execution_time:.2f}s")
+    print(f"total {total:.2f}s")
+
+
+def corpus_states(max_depth=31):
+    for depth, boards in CORPUS.items():
+        if depth <= max_depth:
+            for board in boards:
+                yield depth, [[int(value) for value in board[row * 3 : row * 3 + 3]] for row in range(3)]
+
+
+def percentile(samples, fraction):  # nearest rank
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(len(ordered) * fraction) - 1)]
+
+
+def cpu_seconds():  # this process plus its finished children, which portfolio entrants are
+    times = os.times()
+    return time.process_time() + times.children_user + times.children_system
+
+
+def measure(algo_type, state, optimal, repeat, heuristic=None, memory=True, compact=False):
+    # Memory gets a run of its own, tracemalloc would skew the timings.
+    timings = []
+    cpu = 0.0
+    successes = 0
+    for _ in range(repeat):
+        random.seed(0)
+        cpu_started = cpu_seconds()
+        started = time.perf_counter_ns()
+        solution, _, stats = solution_time(state, algo_type, heuristic, compact=compact)
+        timings.append(time.perf_counter_ns() - started)
+        cpu += cpu_seconds() - cpu_started
+        successes += solution is not None
+    peak = None
+    if memory:
+        random.seed(0)
+        tracemalloc.start()
+        try:
+            solution_time(state, algo_type, heuristic, compact=compact)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    moves = len(solution) - 1 if solution else None
+    return {
+        "timings_ns": timings,
+        "cpu_s": cpu,
+        "successes": successes,
+        "nodes": stats.expanded,
+        "generated": stats.generated,
+        "max_frontier": stats.max_frontier,
+        "winner": stats.winner,
+        "peak_bytes": peak,
+        "moves": moves,
+        "optimal": moves == optimal,
+        "extra_moves": moves - optimal if moves is not None else None,
+    }
+
+
+def run_suite(algorithms=ALGORITHMS, repeat=3, max_depth=31, heuristic=None, memory=True, log=sys.stderr, compact=False):
+    states = list(corpus_states(max_depth))
+    results = {}
+    for algo_type in algorithms:
+        if algo_type in INFORMED:
+            get_heuristic(heuristic, get_board(3))
+        solution_time(GOAL_STATE, algo_type, heuristic)  # loads tables outside the timings
+        timings = []
+        by_depth = {}
+        totals = {"boards": 0, "solved": 0, "optimal": 0, "extra_moves": 0, "nodes": 0, "generated": 0, "max_frontier": 0, "peak_bytes": 0, "cpu_s": 0.0, "successes": 0}
+        for depth, state in states:
+            row = measure(algo_type, state, depth, repeat, heuristic, memory, compact)
+            timings.extend(row["timings_ns"])
+            bucket = by_depth.setdefault(depth, {"timings_ns": [], "nodes": 0})
+            bucket["timings_ns"].extend(row["timings_ns"])
+            bucket["nodes"] += row["nodes"]
+            totals["boards"] += 1
+            totals["nodes"] += row["nodes"]
+            totals["generated"] += row["generated"]
+            totals["cpu_s"] += row["cpu_s"]
+            totals["successes"] += row["successes"]
+            if row["winner"] is not None:
+                winners = totals.setdefault("winners", {})
+                winners[row["winner"]] = winners.get(row["winner"], 0) + 1
+            totals["max_frontier"] = max(totals["max_frontier"], row["max_frontier"])
+            totals["peak_bytes"] = max(totals["peak_bytes"], row["peak_bytes"] or 0)
+            if row["moves"] is not None:
+                totals["solved"] += 1
+                totals["optimal"] += row["optimal"]
+                totals["extra_moves"] += row["extra_moves"]
+        totals["median_ns"] = percentile(timings, 0.5)
+        totals["p95_ns"] = percentile(timings, 0.95)
+        totals["success_per_cpu_s"] = totals["successes"] / totals["cpu_s"] if totals["cpu_s"] else None  # runs that found a path
+        if not memory:
+            totals["peak_bytes"] = None
+        totals["by_depth"] = {
+            depth: {"median_ns": percentile(bucket["timings_ns"], 0.5), "nodes": bucket["nodes"]} for depth, bucket in by_depth.items()
+        }
+        results[algo_type] = totals
+        print(
+            f"{algo_type:22} median {totals['median_ns'] / 1e6:9.3f} ms  p95 {totals['p95_ns'] / 1e6:9.3f} ms  "
+            f"nodes {totals['nodes']:9}  solved {totals['solved']}/{totals['boards']}  optimal {totals['optimal']}  "
+            f"success/cpu-s {totals['success_per_cpu_s'] or 0:.1f}",
+            file=log,
+        )
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeat": repeat,
+        "max_depth": max_depth,
+        "heuristic": heuristic,
+        "compact": compact,
+        "algorithms": results,
+    }
+
+
+def compare(old, new, tolerance=0.1):
+    # Returns the regressions of `new` against `old` as printable lines. Timings and
+    # memory may drift by `tolerance`; node counts and solution quality may not, except
+    # for the RACES metrics, which are not compared.
+    regressions = []
+    for algo_type, after in new["algorithms"].items():
+        before = old["algorithms"].get(algo_type)
+        if before is None:
+            continue
+        skipped = RACES.get(algo_type, set())
+        for metric in METRICS:
+            was, now = before.get(metric), after.get(metric)
+            if was is None or now is None or metric in skipped:
+                continue
+            slack = tolerance if metric in ("median_ns", "p95_ns", "peak_bytes") else 0
+            if now > was * (1 + slack):
+                change = f" (+{(now - was) / was:.0%})" if was else ""
+                regressions.append(f"{algo_type}: {metric} {was} -> {now}{change}")
+        for metric in ("solved", "optimal"):
+            if metric not in skipped and after[metric] < before[metric]:
+                regressions.append(f"{algo_type}: {metric} {before[metric]} -> {after[metric]}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the puzzle solvers")
+    commands = parser.add_subparsers(dest="command")
+    fifteen = commands.add_parser("fifteen", help="solve the fixed 15-puzzle boards")
+    fifteen.add_argument("algo_type", nargs="?", default="ida_star")
+    fifteen.add_argument("heuristic", nargs="?")
+    suite = commands.add_parser("suite", help="run solvers over the frozen 3x3 corpus and write JSON")
+    suite.add_argument("-o", "--output", help="file for the JSON results (default: stdout)")
+    suite.add_argument("-a", "--algorithms", nargs="+", default=ALGORITHMS, choices=ALGORITHMS)
+    suite.add_argument("-r", "--repeat", type=int, default=3)
+    suite.add_argument("-d", "--max-depth", type=int, default=31)
+    suite.add_argument("--heuristic")
+    suite.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    suite.add_argument("--compact", action="store_true", help="run the solvers that take it with compact=True")
+    check = commands.add_parser("compare", help="flag regressions between two suite results")
+    check.add_argument("old")
+    check.add_argument("new")
+    check.add_argument("-t", "--tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    if args.command == "suite":
+        results = run_suite(args.algorithms, args.repeat, args.max_depth, args.heuristic, not args.no_memory, compact=args.compact)
+        if args.output:
+            with open(args.output, "w") as file:
+                json.dump(results, file, indent=2)
+        else:
+            json.dump(results, sys.stdout, indent=2)
+        return 0
+    if args.command == "compare":
+        with open(args.old) as file:
+            old = json.load(file)
+        with open(args.new) as file:
+            new = json.load(file)
+        regressions = compare(old, new, args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        if not regressions:
+            print("no regressions")
+        return 1 if regressions else 0
+    if args.command == "fifteen":
+        run_fifteen_puzzle(args.algo_type, args.heuristic)
+    else:
+        run_fifteen_puzzle()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
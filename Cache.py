@@ -0,0 +1,151 @@
+import glob
+import os
+import shelve
+import sys
+from collections import OrderedDict
+
+from Logic import DATA_DIR, goal_state, hst
+
+CACHE_FILE = os.path.join(DATA_DIR, "solutions")
+
+mirrors = {}
+
+
+def get_mirror(size):
+    # The only grid symmetry besides the identity that keeps the blank's goal corner
+    # in place is the transpose. Tiles are relabelled along with it (the tile whose goal
+    # is cell p becomes the one whose goal is cell p transposed), so the goal maps to
+    # itself and a solution of one board, mirrored step by step, solves the other.
+    if size not in mirrors:
+        cells = size * size
+        goal = [value for row in goal_state(size) for value in row]
+        source = [column * size + row for row in range(size) for column in range(size)]
+        relabel = [0] * cells
+        for index in range(cells):
+            relabel[goal[index]] = goal[source[index]]
+        mirrors[size] = source, relabel
+    return mirrors[size]
+
+
+def mirror(flat, size):  # its own inverse
+    source, relabel = get_mirror(size)
+    return tuple([relabel[flat[index]] for index in source])
+
+
+def canonical(state):  # (key, mirrored): mirrored boards share the smaller of the two keys
+    size = len(state)
+    flat = tuple([value for row in state for value in row])
+    mirrored = mirror(flat, size)
+    if mirrored < flat:
+        return mirrored, True
+    return flat, False
+
+
+def heuristic_key(heuristic):
+    if heuristic is None or isinstance(heuristic, str):
+        return heuristic
+    return type(heuristic).__name__
+
+
+class SolutionCache:
+    # Solutions keyed by (algorithm, heuristic, canonical board), plus the goal for a
+    # solve towards another one, which is left unmirrored since that goal would not map
+    # to itself. The memory tier keeps the `maxsize` most recently used entries; with a
+    # filename, entries are also written to a shelve there and read back after a
+    # restart. Only solved boards are stored,
+    # and a mirrored board gets the mirror image of the stored path, which is as long
+    # as the one its solver would return but not always the same path.
+    def __init__(self, maxsize=4096, filename=None):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.filename = filename
+        self.disk = shelve.open(filename) if filename else None
+
+    def key(self, state, algo_type, heuristic, goal=None):
+        if goal is not None:
+            return (algo_type, heuristic_key(heuristic), hst(state), hst(goal)), False
+        board, mirrored = canonical(state)
+        return (algo_type, heuristic_key(heuristic), board), mirrored
+
+    def get(self, start_state, algo_type, heuristic=None, goal=None):  # the path, or None on a miss
+        key, mirrored = self.key(start_state, algo_type, heuristic, goal)
+        steps = self.entries.get(key)
+        if steps is not None:
+            self.entries.move_to_end(key)
+        elif self.disk is not None:
+            steps = self.disk.get(repr(key))
+            if steps is not None:
+                self.store(key, steps)
+        if steps is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        size = len(start_state)
+        if mirrored:
+            source, relabel = get_mirror(size)
+            rows = [source[row * size : (row + 1) * size] for row in range(size)]
+            return [[[relabel[step[index]] for index in cells] for cells in rows] for step in steps]
+        bounds = [(row * size, (row + 1) * size) for row in range(size)]
+        return [[list(step[first:last]) for first, last in bounds] for step in steps]
+
+    def put(self, start_state, algo_type, heuristic, solution, goal=None):
+        key, mirrored = self.key(start_state, algo_type, heuristic, goal)
+        size = len(start_state)
+        steps = tuple(tuple([value for row in step for value in row]) for step in solution)
+        if mirrored:
+            steps = tuple(mirror(step, size) for step in steps)
+        self.store(key, steps)
+        if self.disk is not None:
+            self.disk[repr(key)] = steps
+
+    def store(self, key, steps):
+        if key in self.entries:
+            self.bytes -= entry_bytes(key, self.entries.pop(key))
+        self.entries[key] = steps
+        self.bytes += entry_bytes(key, steps)
+        while len(self.entries) > self.maxsize:
+            old_key, old_steps = self.entries.popitem(last=False)
+            self.bytes -= entry_bytes(old_key, old_steps)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def disk_bytes(self):  # shelve's files are named after `filename`, with a suffix depending on the dbm module
+        if self.filename is None:
+            return 0
+        return sum(os.path.getsize(name) for name in glob.glob(glob.escape(self.filename) + "*"))
+
+    def info(self):
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate(),
+            "bytes": self.bytes,
+            "disk_bytes": self.disk_bytes(),
+        }
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+        if self.disk is not None:
+            self.disk.clear()
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+            self.disk = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def entry_bytes(key, steps):  # container sizes only, the small ints inside are shared
+    return sys.getsizeof(key) + sys.getsizeof(key[2]) + sys.getsizeof(steps) + sum(sys.getsizeof(step) for step in steps)
@@ -0,0 +1,122 @@
+import argparse
+import json
+import sys
+
+from Logic import ALGORITHMS, HEURISTICS, Budget, solution_time
+
+
+def read_boards(lines):
+    # Each line holds a board as a list of rows, or an object with a "board", an
+    # optional "id" that is echoed back and an optional "goal" layout. Yields
+    # (index, id, board, goal, error).
+    for index, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+            if isinstance(item, dict):
+                job_id, board, goal = item.get("id"), item["board"], item.get("goal")
+            else:
+                job_id, board, goal = None, item, None
+            check_board(board)
+            if goal is not None:
+                check_board(goal)
+                if len(goal) != len(board):
+                    raise ValueError("the goal and the board differ in size")
+        except (ValueError, KeyError, TypeError) as error:
+            yield index, None, None, None, f"{type(error).__name__}: {error}"
+            continue
+        yield index, job_id, board, goal, None
+
+
+def check_board(board):
+    size = len(board)
+    if size < 2 or any(not isinstance(row, list) or len(row) != size for row in board):
+        raise ValueError("a board is a square list of rows")
+    if sorted(value for row in board for value in row) != list(range(size * size)):
+        raise ValueError(f"a {size}x{size} board holds the numbers 0 to {size * size - 1} once each")
+
+
+def result_line(index, job_id, solution, execution_time, stats):
+    result = {"index": index}
+    if job_id is not None:
+        result["id"] = job_id
+    result["moves"] = len(solution) - 1 if solution else None
+    result["time"] = round(execution_time, 6)
+    result["solution"] = solution
+    result["stats"] = stats.as_dict()
+    return json.dumps(result)
+
+
+def error_line(index, error):
+    return json.dumps({"index": index, "error": error})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve boards read as JSON lines and write one JSON line per result")
+    parser.add_argument("input", nargs="?", help="file with one board per line (default: stdin)")
+    parser.add_argument("-a", "--algorithm", default="ida_star", choices=ALGORITHMS)
+    parser.add_argument("--heuristic", choices=sorted(HEURISTICS))
+    parser.add_argument("-w", "--workers", type=int, default=1, help="solve over a process pool; results come in the order they finish")
+    parser.add_argument("--nodes", type=int, help="give up on a board after this many expansions")
+    parser.add_argument("--seconds", type=float, help="give up on a board after this long")
+    parser.add_argument("--cache", help="file for a persistent solution cache")
+    parser.add_argument("--compact", action="store_true", help="keep visited states in a bitset (3x3 bfs, dfs, ucs, gbfs and A_star)")
+    args = parser.parse_args(argv)
+
+    if args.cache and args.workers > 1:
+        parser.error("--cache needs a single worker")
+    if args.algorithm.startswith("portfolio") and args.workers > 1:
+        parser.error("a portfolio runs its solvers in processes of its own, so it needs a single worker")
+
+    budget = Budget(args.nodes, args.seconds) if args.nodes is not None or args.seconds is not None else None
+    cache = None
+    if args.cache:
+        from Cache import SolutionCache
+
+        cache = SolutionCache(filename=args.cache)
+    source = open(args.input) if args.input else sys.stdin
+    errors = 0
+    try:
+        if args.workers > 1:
+            from Parallel import solve_many  # multiprocessing is only imported when asked for
+
+            jobs = []
+            for index, job_id, board, goal, error in read_boards(source):
+                if error is not None:
+                    errors += 1
+                    print(error_line(index, error), flush=True)
+                else:
+                    jobs.append((index, job_id, board, goal))
+            results = solve_many([board for _, _, board, _ in jobs], args.algorithm, args.workers, args.heuristic, budget=budget, goals=[goal for _, _, _, goal in jobs], compact=args.compact)
+            for number, solution, execution_time, stats in results:
+                index, job_id, _, _ = jobs[number]
+                if stats.exhausted is not None and stats.exhausted.startswith("error: "):
+                    errors += 1
+                    print(error_line(index, stats.exhausted[len("error: ") :]), flush=True)
+                    continue
+                print(result_line(index, job_id, solution, execution_time, stats), flush=True)
+        else:
+            for index, job_id, board, goal, error in read_boards(source):
+                if error is not None:
+                    errors += 1
+                    print(error_line(index, error), flush=True)
+                    continue
+                try:
+                    solution, execution_time, stats = solution_time(board, args.algorithm, args.heuristic, budget=budget, cache=cache, goal=goal, compact=args.compact)
+                except Exception as error:  # one board the solver cannot take does not end the stream
+                    errors += 1
+                    print(error_line(index, f"{type(error).__name__}: {error}"), flush=True)
+                    continue
+                print(result_line(index, job_id, solution, execution_time, stats), flush=True)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if cache is not None:
+            cache.close()
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
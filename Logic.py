@@ -1,25 +1,39 @@
+import math
+import mmap
+import os
 import random
+import tempfile
 import time
+from array import array
 from collections import deque
-from heapq import heappop, heappush
+from heapq import heapify, heappop, heappush, nsmallest
+from itertools import permutations
 
 GOAL_STATE = [[1, 2, 3], [4, 5, 6], [7, 8, 0]]
 
+DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+UNSEEN = 0xFF
+
+
+def goal_state(size=3):
+    return [[(i * size + j + 1) % (size * size) for j in range(size)] for i in range(size)]
+
 
 def find_blank(state):
-    for i in range(3):
-        for j in range(3):
+    for i in range(len(state)):
+        for j in range(len(state)):
             if state[i][j] == 0:
                 return i, j
 
 
 def generate_children(state):
+    size = len(state)
     x, y = find_blank(state)
     children = []
-    directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-    for dx, dy in directions:
+    for dx, dy in DIRECTIONS:
         nx, ny = x + dx, y + dy
-        if 0 <= nx < 3 and 0 <= ny < 3:
+        if 0 <= nx < size and 0 <= ny < size:
             new_state = [row[:] for row in state]
             new_state[x][y], new_state[nx][ny] = new_state[nx][ny], new_state[x][y]
             children.append(new_state)
@@ -27,7 +41,21 @@ def generate_children(state):
 
 
 def is_goal(state):
-    return state == GOAL_STATE
+    return state == goal_state(len(state))
+
+
+def is_solvable(state):
+    # Inversion parity decides it. On even widths every vertical move also flips the
+    # parity, so the blank's row distance from the bottom is added in.
+    size = len(state)
+    tiles = [value for row in state for value in row if value != 0]
+    inversions = 0
+    for i in range(len(tiles)):
+        for j in range(i + 1, len(tiles)):
+            if tiles[i] > tiles[j]:
+                inversions += 1
+    blank_row = find_blank(state)[0]
+    return (inversions + (size - 1 - blank_row) * (size - 1)) % 2 == 0
 
 
 def hst(state):  # hashable state
@@ -38,284 +66,2179 @@ def uhst(state):  # unhashable state
     return list(map(list, state))
 
 
-def hill_simp(start_state):
-    path = {hst(start_state): None}
-    current = start_state
+def grid_symmetries(size):  # the eight rotations and reflections, each as the source cell of every cell
+    symmetries = []
+    for transpose in (False, True):
+        for flip_rows in (False, True):
+            for flip_columns in (False, True):
+                source = []
+                for index in range(size * size):
+                    row, column = divmod(index, size)
+                    if transpose:
+                        row, column = column, row
+                    if flip_rows:
+                        row = size - 1 - row
+                    if flip_columns:
+                        column = size - 1 - column
+                    source.append(row * size + column)
+                symmetries.append(source)
+    return symmetries
+
+
+class GoalMap:
+    # Carries boards solved towards `goal` over to the standard goal, so every solver,
+    # heuristic, table and cache keeps working unchanged. A grid symmetry takes the
+    # goal's blank to the bottom-right corner and the tiles are relabelled after the
+    # standard goal; both preserve moves, so paths map back step by step. A blank off
+    # the corners is first slid to the nearest one along `slide`, which is appended in
+    # reverse to every path: still a solution, but up to twice that many moves longer
+    # than the best one, which is why solution_time has the optimal solvers search
+    # towards to_standard(goal) itself instead.
+    def __init__(self, goal):
+        size = len(goal)
+        cells = size * size
+        last = cells - 1
+        self.size = size
+        self.slide = [uhst(goal)]
+        x, y = find_blank(goal)
+        corner_x = 0 if x < size - 1 - x else size - 1
+        corner_y = 0 if y < size - 1 - y else size - 1
+        while (x, y) != (corner_x, corner_y):
+            if y != corner_y:
+                dx, dy = 0, 1 if corner_y > y else -1
+            else:
+                dx, dy = 1 if corner_x > x else -1, 0
+            step = [row[:] for row in self.slide[-1]]
+            step[x][y], step[x + dx][y + dy] = step[x + dx][y + dy], 0
+            self.slide.append(step)
+            x, y = x + dx, y + dy
+        end = [value for row in self.slide[-1] for value in row]
+        self.source = next(source for source in grid_symmetries(size) if source[last] == x * size + y)
+        standard = [value for row in goal_state(size) for value in row]
+        self.relabel = [0] * cells
+        for index in range(cells):
+            self.relabel[end[self.source[index]]] = standard[index]
+        self.inverse = [0] * cells
+        for value in range(cells):
+            self.inverse[self.relabel[value]] = value
+
+    def to_standard(self, state):
+        flat = [value for row in state for value in row]
+        cells = [self.relabel[flat[index]] for index in self.source]
+        return [cells[row * self.size : (row + 1) * self.size] for row in range(self.size)]
+
+    def from_standard(self, state):
+        flat = [value for row in state for value in row]
+        cells = [0] * len(flat)
+        for index, value in enumerate(flat):
+            cells[self.source[index]] = self.inverse[value]
+        return [cells[row * self.size : (row + 1) * self.size] for row in range(self.size)]
+
+    def path_back(self, solution):
+        return [self.from_standard(step) for step in solution] + [[row[:] for row in step] for step in self.slide[-2::-1]]
+
+
+goal_maps = {}
+
+
+def get_goal_map(goal):
+    key = hst(goal)
+    if key not in goal_maps:
+        goal_maps[key] = GoalMap(goal)
+    return goal_maps[key]
+
+
+class Board:
+    # Packed codes for one size x size puzzle: each cell takes cell_bits bits and the
+    # blank's index rides above the cells, so it never has to be searched for.
+    def __init__(self, size):
+        self.size = size
+        self.cells = size * size
+        self.cell_bits = max(4, (self.cells - 1).bit_length())
+        self.cell_mask = (1 << self.cell_bits) - 1
+        self.blank_shift = self.cells * self.cell_bits
+        self.goal_state = goal_state(size)
+        self.goal_code = self.pack(self.goal_state)
+        self.goal_positions = self.tile_positions(self.goal_code)
+        self.neighbours, self.md_delta, self.moves = build_move_tables(self)
+        self.row_order = None
+
+    def pack(self, state):
+        code = 0
+        blank = 0
+        for index, value in enumerate(value for row in state for value in row):
+            code |= value << (index * self.cell_bits)
+            if value == 0:
+                blank = index
+        return code | (blank << self.blank_shift)
+
+    def unpack(self, code):
+        cells = [(code >> (index * self.cell_bits)) & self.cell_mask for index in range(self.cells)]
+        return [cells[i * self.size : (i + 1) * self.size] for i in range(self.size)]
+
+    def tile_positions(self, code):
+        positions = [0] * self.cells
+        for index in range(self.cells):
+            positions[(code >> (index * self.cell_bits)) & self.cell_mask] = index
+        return positions
+
+    def children(self, code):
+        children = []
+        mask = self.cell_mask
+        for shift, mult, flip, _ in self.moves[code >> self.blank_shift]:
+            children.append(code ^ ((code >> shift) & mask) * mult ^ flip)
+        return children
+
+    def expand(self, code, h, parent=None, moves=None):  # children paired with their manhattan distance, parent left out
+        children = []
+        mask = self.cell_mask
+        for shift, mult, flip, delta in (moves or self.moves)[code >> self.blank_shift]:
+            tile = (code >> shift) & mask
+            child = code ^ tile * mult ^ flip
+            if child != parent:
+                children.append((child, h + delta[tile]))
+        return children
+
+    def order(self, code):  # sorts codes like their row-major tile lists, the way the boards themselves compare
+        row_bits = self.size * self.cell_bits
+        if row_bits > 16:
+            return sum(((code >> (index * self.cell_bits)) & self.cell_mask) << ((self.cells - 1 - index) * self.cell_bits) for index in range(self.cells))
+        if self.row_order is None:  # row bits reversed cell by cell, so the first cell is the most significant
+            self.row_order = [sum(((row >> (index * self.cell_bits)) & self.cell_mask) << ((self.size - 1 - index) * self.cell_bits) for index in range(self.size)) for row in range(1 << row_bits)]
+        row_mask = (1 << row_bits) - 1
+        key = 0
+        for row in range(self.size):
+            key = (key << row_bits) | self.row_order[(code >> (row * row_bits)) & row_mask]
+        return key
+
+    def manhattan(self, code, target=None, positions=None):  # `positions` of `target` when the caller has them
+        if positions is None:
+            positions = self.goal_positions if target is None else self.tile_positions(target)
+        distance = 0
+        for index in range(self.cells):
+            value = (code >> (index * self.cell_bits)) & self.cell_mask
+            if value != 0:
+                target_x, target_y = divmod(positions[value], self.size)
+                i, j = divmod(index, self.size)
+                distance += abs(target_x - i) + abs(target_y - j)
+        return distance
+
+
+def build_move_tables(board, target=None):  # deltas are measured against `target`, the goal by default
+    size, cells = board.size, board.cells
+    neighbours = []
+    for blank in range(cells):
+        x, y = divmod(blank, size)
+        neighbours.append(tuple((x + dx) * size + y + dy for dx, dy in DIRECTIONS if 0 <= x + dx < size and 0 <= y + dy < size))
+    positions = board.tile_positions(board.goal_code if target is None else target)
+    md_delta = [[[0] * cells for _ in range(cells)] for _ in range(cells)]  # md_delta[tile][src][dst]
+    for tile in range(1, cells):
+        target_x, target_y = divmod(positions[tile], size)
+        for src in range(cells):
+            for dst in range(cells):
+                (sx, sy), (dx, dy) = divmod(src, size), divmod(dst, size)
+                before = abs(target_x - sx) + abs(target_y - sy)
+                after = abs(target_x - dx) + abs(target_y - dy)
+                md_delta[tile][src][dst] = after - before
+    moves = []  # moves[blank]: (shift of the moving tile, xor multiplier, blank xor, h delta per tile)
+    for blank in range(cells):
+        moves.append(
+            tuple(
+                (
+                    index * board.cell_bits,
+                    (1 << (index * board.cell_bits)) | (1 << (blank * board.cell_bits)),
+                    (blank ^ index) << board.blank_shift,
+                    tuple(md_delta[tile][index][blank] for tile in range(cells)),
+                )
+                for index in neighbours[blank]
+            )
+        )
+    return neighbours, md_delta, moves
+
+
+boards = {}
+
+
+def get_board(size=3):
+    if size not in boards:
+        boards[size] = Board(size)
+    return boards[size]
+
+
+BOARD = get_board(3)
+CELL_BITS = BOARD.cell_bits
+CELL_MASK = BOARD.cell_mask
+BLANK_SHIFT = BOARD.blank_shift
+GOAL_CODE = BOARD.goal_code
+NEIGHBOURS, MOVES = BOARD.neighbours, BOARD.moves
+
+
+def pack(state):
+    return get_board(len(state)).pack(state)
+
+
+def unpack(code, size=3):
+    return get_board(size).unpack(code)
+
+
+FACTORIALS = [1, 1, 2, 6, 24, 120, 720, 5040, 40320]
+STATE_COUNT = 181440  # states reachable from GOAL_STATE
+HALF_PERMUTATIONS = 20160  # even orderings of the eight tiles
+
+
+def rank(code):  # index of a reachable 3x3 code in 0..STATE_COUNT-1, None for the unreachable half
+    blank = code >> BLANK_SHIFT
+    seen = 0
+    lehmer = 0
+    inversions = 0
+    weight = 7
+    for index in range(9):
+        if index == blank:
+            continue
+        tile = (code >> (index * CELL_BITS)) & CELL_MASK
+        smaller = tile - 1 - (seen & ((1 << tile) - 1)).bit_count()
+        seen |= 1 << tile
+        lehmer += smaller * FACTORIALS[weight]
+        inversions += smaller
+        weight -= 1
+    if inversions & 1:
+        return None
+    return blank * HALF_PERMUTATIONS + (lehmer >> 1)
+
+
+def unrank(number):
+    blank, half = divmod(number, HALF_PERMUTATIONS)
+    lehmer = half << 1
+    remaining = list(range(1, 9))
+    tiles = []
+    inversions = 0
+    for weight in range(7, -1, -1):
+        digit, lehmer = divmod(lehmer, FACTORIALS[weight])
+        tiles.append(remaining.pop(digit))
+        inversions += digit
+    if inversions & 1:  # its twin with the last two tiles swapped is the reachable one
+        tiles[-2], tiles[-1] = tiles[-1], tiles[-2]
+    tiles.insert(blank, 0)
+    code = blank << BLANK_SHIFT
+    for index, tile in enumerate(tiles):
+        code |= tile << (index * CELL_BITS)
+    return code
+
+
+rank_tables = None
+
+
+def get_rank_tables():
+    # rank() without the loop, for codes already known to be reachable: with the blank
+    # squeezed out, the eight tiles fit in 32 bits, and the Lehmer digits of the first
+    # four depend only on those four tiles (tile - 1 less the smaller ones before it),
+    # those of the last four only on the last four. So the code is the sum of one entry
+    # from each of two tables indexed by the 16-bit halves.
+    global rank_tables
+    if rank_tables is None:
+        head = array("H", bytes(2 << 16))
+        tail = array("H", bytes(2 << 16))
+        for tiles in permutations(range(1, 9), 4):
+            key = tiles[0] | tiles[1] << 4 | tiles[2] << 8 | tiles[3] << 12
+            for j, tile in enumerate(tiles):
+                before = sum(1 for other in tiles[:j] if other < tile)
+                after = sum(1 for other in tiles[j + 1 :] if other < tile)
+                head[key] += (tile - 1 - before) * FACTORIALS[7 - j]
+                tail[key] += after * FACTORIALS[3 - j]
+        low = [(1 << (index * CELL_BITS)) - 1 for index in range(9)]
+        high = [((1 << (8 * CELL_BITS)) - 1) ^ mask for mask in low]
+        rank_tables = head, tail, low, high
+    return rank_tables
+
+
+class RankedTable:
+    # Base of the 3x3 search tables below: one slot per rank, found with the rank tables.
+    # The lookups are written out in each method, as a call apiece would double their cost.
+    def __init__(self):
+        self.head, self.tail, self.low, self.high = get_rank_tables()
+        self.count = 0
+
+    def index(self, code):
+        blank = code >> BLANK_SHIFT
+        tiles = (code & self.low[blank]) | ((code >> CELL_BITS) & self.high[blank])
+        return blank * HALF_PERMUTATIONS + ((self.head[tiles & 0xFFFF] + self.tail[tiles >> 16]) >> 1)
+
+    def __len__(self):
+        return self.count
+
+
+class ParentMoves(RankedTable):
+    # The parent links of a search without a dict: one bit per rank says whether a
+    # state has been reached, and two more hold the slot in MOVES[blank] that leads
+    # back to its parent, as in the lookup table. It reads and writes like the
+    # {code: parent} dicts, so re_path walks it by replaying those moves. About 68 KB
+    # for the whole state space.
+    def __init__(self, start):
+        super().__init__()
+        self.start = start
+        self.seen = bytearray(STATE_COUNT + 7 >> 3)
+        self.moves = bytearray(STATE_COUNT + 3 >> 2)
+        self.slots = [[NEIGHBOURS[blank].index(parent) if parent in NEIGHBOURS[blank] else 0 for parent in range(9)] for blank in range(9)]
+        self[start] = None
+
+    def __contains__(self, code):
+        blank = code >> BLANK_SHIFT
+        tiles = (code & self.low[blank]) | ((code >> CELL_BITS) & self.high[blank])
+        number = blank * HALF_PERMUTATIONS + ((self.head[tiles & 0xFFFF] + self.tail[tiles >> 16]) >> 1)
+        return self.seen[number >> 3] >> (number & 7) & 1
+
+    def __setitem__(self, code, parent):
+        blank = code >> BLANK_SHIFT
+        tiles = (code & self.low[blank]) | ((code >> CELL_BITS) & self.high[blank])
+        number = blank * HALF_PERMUTATIONS + ((self.head[tiles & 0xFFFF] + self.tail[tiles >> 16]) >> 1)
+        seen = self.seen
+        bit = 1 << (number & 7)
+        if not seen[number >> 3] & bit:
+            seen[number >> 3] |= bit
+            self.count += 1
+        if parent is not None:
+            shift = (number & 3) << 1
+            moves = self.moves
+            moves[number >> 2] = moves[number >> 2] & ~(3 << shift) | self.slots[blank][parent >> BLANK_SHIFT] << shift
+
+    def __getitem__(self, code):
+        if code == self.start:
+            return None
+        number = self.index(code)
+        slot = self.moves[number >> 2] >> ((number & 3) << 1) & 3
+        shift, mult, flip, _ = MOVES[code >> BLANK_SHIFT][slot]
+        return code ^ ((code >> shift) & CELL_MASK) * mult ^ flip
+
+
+class CostTable(RankedTable):
+    # g values, one byte per rank and UNSEEN until set, read like a {code: g} dict
+    def __init__(self, start):
+        super().__init__()
+        self.costs = bytearray([UNSEEN]) * STATE_COUNT
+        self[start] = 0
+
+    def __contains__(self, code):
+        return self.costs[self.index(code)] != UNSEEN
+
+    def __setitem__(self, code, cost):
+        blank = code >> BLANK_SHIFT
+        tiles = (code & self.low[blank]) | ((code >> CELL_BITS) & self.high[blank])
+        number = blank * HALF_PERMUTATIONS + ((self.head[tiles & 0xFFFF] + self.tail[tiles >> 16]) >> 1)
+        self.count += self.costs[number] == UNSEEN
+        self.costs[number] = cost
+
+    def __getitem__(self, code):
+        cost = self.costs[self.index(code)]
+        if cost == UNSEEN:
+            raise KeyError(code)
+        return cost
+
+    def get(self, code, default=None):
+        blank = code >> BLANK_SHIFT
+        tiles = (code & self.low[blank]) | ((code >> CELL_BITS) & self.high[blank])
+        cost = self.costs[blank * HALF_PERMUTATIONS + ((self.head[tiles & 0xFFFF] + self.tail[tiles >> 16]) >> 1)]
+        return default if cost == UNSEEN else cost
+
+
+def parent_table(board, start, compact=False):
+    # The {code: parent} dict of a search, or with compact=True on the 3x3 board its
+    # ParentMoves stand-in: a full-space bfs then keeps about 1 MB instead of about
+    # 20 MB, but runs two to three times slower for the rank behind every lookup.
+    if compact and board.size == 3:
+        return ParentMoves(start)
+    return {start: None}
+
+
+def cost_table(board, start, compact=False):
+    if compact and board.size == 3:
+        return CostTable(start)
+    return {start: 0}
+
+
+class SearchStats:
+    # Work done by one solve. The busy loops keep their counters in locals and add
+    # them here when they return, and the hooks cost a None check when unset:
+    # on_expand(code) for every expanded state, on_iteration(number, bound) for every
+    # IDDFS depth, IDA* threshold or ARA* weight pass, on_solution(path, bound) for
+    # every improved ARA* path.
+    fields = ("expanded", "generated", "duplicates", "max_frontier", "iterations", "plateaus", "exhausted", "winner")
+
+    def __init__(self, on_expand=None, on_iteration=None, on_solution=None):
+        self.expanded = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.max_frontier = 0
+        self.iterations = 0
+        self.plateaus = 0
+        self.exhausted = None  # which Budget limit stopped the solve, if one did
+        self.winner = None  # the solver whose path a portfolio returned
+        self.on_expand = on_expand
+        self.on_iteration = on_iteration
+        self.on_solution = on_solution
+
+    def add(self, expanded, generated, duplicates, max_frontier):
+        self.expanded += expanded
+        self.generated += generated
+        self.duplicates += duplicates
+        if max_frontier > self.max_frontier:
+            self.max_frontier = max_frontier
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.fields}
+
+    def __repr__(self):
+        return "SearchStats(" + ", ".join(f"{name}={value}" for name, value in self.as_dict().items()) + ")"
+
+    def __getstate__(self):  # hooks stay in the process that set them
+        return self.as_dict()
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.__dict__.update(state)
+
+
+class BudgetExhausted(Exception):
+    def __init__(self, reason):
+        super().__init__(f"search budget exhausted: {reason}")
+        self.reason = reason
+
+
+class Budget:
+    # Limits for one solve: expanded nodes, seconds from start(), states held in the
+    # solver's tables (its memory, which is what grows) and a cancellation token, any
+    # object with is_set() such as a threading or multiprocessing Event. Solvers call
+    # check() every `interval` expansions; it raises BudgetExhausted, which
+    # solution_time turns into a None solution with stats.exhausted set.
+    def __init__(self, nodes=None, seconds=None, states=None, token=None, interval=1024):
+        self.nodes = nodes
+        self.seconds = seconds
+        self.states = states
+        self.token = token
+        self.interval = interval
+        self.deadline = None
+        self.next_check = 0
+
+    def start(self):
+        if self.seconds is not None:
+            self.deadline = time.perf_counter() + self.seconds
+        return self.schedule(0)
+
+    def schedule(self, expanded):
+        self.next_check = expanded + self.interval
+        if self.nodes is not None and self.nodes < self.next_check:
+            self.next_check = max(self.nodes, expanded)
+        return self.next_check
+
+    def check(self, expanded, stored):
+        if self.nodes is not None and expanded >= self.nodes:
+            raise BudgetExhausted("nodes")
+        if self.states is not None and stored > self.states:
+            raise BudgetExhausted("memory")
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise BudgetExhausted("deadline")
+        if self.token is not None and self.token.is_set():
+            raise BudgetExhausted("cancelled")
+        return self.schedule(expanded)
+
+
+def drain(events):  # runs a *_events generator to the end and returns the path it returns
+    try:
+        while True:
+            next(events)
+    except StopIteration as stop:
+        return stop.value
+
+
+# Every solver below is written as a generator, <name>_events, that yields one
+# (code, g, h, frontier) tuple per expanded state: the packed state, its depth, its
+# heuristic value (None for uninformed searches) and the number of states waiting to
+# be expanded. The path (or None) is its return value. With trace=False it yields
+# nothing, which is how the plain solver functions drain it.
+
+
+def hill_simp_events(start_state, heuristic=None, stats=None, budget=None, trace=True):
+    stats = stats or SearchStats()
+    if budget is not None:
+        budget.start()
+    board = get_board(len(start_state))
+    heuristic = get_heuristic(heuristic, board)
+    start = board.pack(start_state)
+    path = {start: None}
+    current = start
+    current_h = heuristic(current)
     while True:
-        current_h = manhattan_distance(current)
         improved = False
-        children = generate_children(current)
+        if budget is not None and stats.expanded >= budget.next_check:
+            budget.check(stats.expanded, len(path))
+        children = heuristic.expand(current, current_h)
+        stats.add(1, len(children), 0, 1)
+        if stats.on_expand is not None:
+            stats.on_expand(current)
+        if trace:
+            yield current, len(path) - 1, current_h, 1
         random.shuffle(children)
-        for child in children:
-            child_h = manhattan_distance(child)
+        for child, child_h in children:
             if child_h < current_h:
-                path[hst(child)] = current
-                current = child
+                path[child] = current
+                current, current_h = child, child_h
                 improved = True
                 break
         if not improved:
+            stats.plateaus += 1
             break
-        if is_goal(current):
-            return re_path(path, current)
+        if current == board.goal_code:
+            return re_path(path, current, board)
     return None
 
 
-def hill_climbing_steepest(start_state):
-    path = {hst(start_state): None}
-    current = start_state
+def hill_simp(start_state, heuristic=None, stats=None, budget=None):
+    return drain(hill_simp_events(start_state, heuristic, stats, budget, trace=False))
+
+
+def hill_climbing_steepest_events(start_state, heuristic=None, stats=None, budget=None, trace=True):
+    stats = stats or SearchStats()
+    if budget is not None:
+        budget.start()
+    board = get_board(len(start_state))
+    heuristic = get_heuristic(heuristic, board)
+    start = board.pack(start_state)
+    path = {start: None}
+    current = start
+    current_h = heuristic(current)
     while True:
-        current_h = manhattan_distance(current)
         best_neighbor = None
         best_neighbor_h = current_h
-        for child in generate_children(current):
-            child_h = manhattan_distance(child)
+        if budget is not None and stats.expanded >= budget.next_check:
+            budget.check(stats.expanded, len(path))
+        children = heuristic.expand(current, current_h)
+        stats.add(1, len(children), 0, 1)
+        if stats.on_expand is not None:
+            stats.on_expand(current)
+        if trace:
+            yield current, len(path) - 1, current_h, 1
+        for child, child_h in children:
             if child_h < best_neighbor_h:
                 best_neighbor = child
                 best_neighbor_h = child_h
         if best_neighbor is not None and best_neighbor_h < current_h:
-            path[hst(best_neighbor)] = current
-            current = best_neighbor
-            if is_goal(current):
-                return re_path(path, current)
+            path[best_neighbor] = current
+            current, current_h = best_neighbor, best_neighbor_h
+            if current == board.goal_code:
+                return re_path(path, current, board)
         else:
+            stats.plateaus += 1
             break
     return None
 
 
-def hill_climbing_stochastic(start_state):
-    path = {hst(start_state): None}
-    current = start_state
+def hill_climbing_steepest(start_state, heuristic=None, stats=None, budget=None):
+    return drain(hill_climbing_steepest_events(start_state, heuristic, stats, budget, trace=False))
+
+
+def hill_climbing_stochastic_events(start_state, heuristic=None, stats=None, budget=None, trace=True):
+    stats = stats or SearchStats()
+    if budget is not None:
+        budget.start()
+    board = get_board(len(start_state))
+    heuristic = get_heuristic(heuristic, board)
+    start = board.pack(start_state)
+    path = {start: None}
+    current = start
+    current_h = heuristic(current)
     while True:
-        current_h = manhattan_distance(current)
         improved_neighbors = []
         weights = []
-        for child in generate_children(current):
-            child_h = manhattan_distance(child)
+        if budget is not None and stats.expanded >= budget.next_check:
+            budget.check(stats.expanded, len(path))
+        children = heuristic.expand(current, current_h)
+        stats.add(1, len(children), 0, 1)
+        if stats.on_expand is not None:
+            stats.on_expand(current)
+        if trace:
+            yield current, len(path) - 1, current_h, 1
+        for child, child_h in children:
             if child_h < current_h:
-                improved_neighbors.append(child)
+                improved_neighbors.append((child, child_h))
                 weights.append(current_h - child_h)
         if improved_neighbors:
-            chosen = random.choices(improved_neighbors, weights=weights, k=1)[0]
-            path[hst(chosen)] = current
-            current = chosen
-            if is_goal(current):
-                return re_path(path, current)
+            chosen, chosen_h = random.choices(improved_neighbors, weights=weights, k=1)[0]
+            path[chosen] = current
+            current, current_h = chosen, chosen_h
+            if current == board.goal_code:
+                return re_path(path, current, board)
         else:
+            stats.plateaus += 1
             break
     return None
 
 
-def bfs(start_state):
-    queue = deque([start_state])
-    visited = set()
-    visited.add(hst(start_state))
-    path = {hst(start_state): None}
-    while queue:
-        current = queue.popleft()
-        if is_goal(current):
-            return re_path(path, current)
-        for child in generate_children(current):
-            child_hst = hst(child)
-            if child_hst not in visited:
-                visited.add(child_hst)
-                queue.append(child)
-                path[child_hst] = current
-    return None
+def hill_climbing_stochastic(start_state, heuristic=None, stats=None, budget=None):
+    return drain(hill_climbing_stochastic_events(start_state, heuristic, stats, budget, trace=False))
 
 
-def ucs(start_state):
-    pq = []
-    heappush(pq, (0, start_state))
-    visited = {}
-    visited[hst(start_state)] = 0
-    path = {hst(start_state): None}
-    while pq:
-        cost, current = heappop(pq)
-        if is_goal(current):
-            return re_path(path, current)
-        for child in generate_children(current):
-            child_hst = hst(child)
-            new_cost = cost + 1
-            if child_hst not in visited or new_cost < visited[child_hst]:
-                visited[child_hst] = new_cost
-                heappush(pq, (new_cost, child))
-                path[child_hst] = current
-    return None
+DEFAULT_EVALUATIONS = 100000  # neighbours scored before a local search gives up
+TABU_BITS = 16
+WALK_LIMIT = 200
+
+# Temperature at `step` of `steps` for simulated annealing, starting from t0.
+COOLING = {
+    "linear": lambda t0, step, steps: t0 * (1 - step / steps),
+    "exponential": lambda t0, step, steps: t0 * 0.01 ** (step / steps),
+    "logarithmic": lambda t0, step, steps: t0 / math.log(step + math.e),
+}
+
+
+def tabu_key(code):  # multiplicative hash down to TABU_BITS bits
+    return (code * 0x9E3779B97F4A7C15 & 0xFFFFFFFFFFFFFFFF) >> (64 - TABU_BITS)
+
+
+def loop_free(steps):  # the walk with its cycles cut out, still a path from its first state to its last
+    index = {}
+    path = []
+    for code in steps:
+        if code in index:
+            cut = index[code] + 1
+            for removed in path[cut:]:
+                del index[removed]
+            del path[cut:]
+        else:
+            index[code] = len(path)
+            path.append(code)
+    return path
 
 
-def deepening(state, depth, visited, path):  # dept là độ sâu còn lại mà ta có thể xuống, xuống một bậc thì depth giảm một
-    if is_goal(state):
-        return re_path(path, state)
-    if depth == 0:
+def hill_restarts_events(start_state, heuristic=None, sideways=50, evaluations=DEFAULT_EVALUATIONS, seed=None, stats=None, budget=None, trace=True):
+    # Steepest ascent that may also take up to `sideways` equal moves in a row (never
+    # straight back). At a local minimum or at the end of a plateau it restarts from the
+    # start, first walking a random number of moves (up to the number of restarts so
+    # far, at most WALK_LIMIT) so that each climb begins somewhere new. The walk is part
+    # of the path.
+    stats = stats or SearchStats()
+    check_at = budget.start() if budget is not None else -1
+    on_expand = stats.on_expand
+    rng = random.Random(seed) if seed is not None else random
+    board = get_board(len(start_state))
+    heuristic = get_heuristic(heuristic, board)
+    start = board.pack(start_state)
+    goal = board.goal_code
+    expanded = generated = 0
+    try:
+        while generated < evaluations:
+            stats.iterations += 1
+            steps = [start]
+            for _ in range(rng.randint(0, min(stats.iterations - 1, WALK_LIMIT))):
+                children = board.children(steps[-1])
+                generated += len(children)
+                steps.append(rng.choice(children))
+            current = steps[-1]
+            current_h = heuristic(current)
+            parent = steps[-2] if len(steps) > 1 else None
+            flat = 0
+            while current != goal and generated < evaluations:
+                if expanded == check_at:
+                    check_at = budget.check(expanded, len(steps))
+                expanded += 1
+                if on_expand is not None:
+                    on_expand(current)
+                if trace:
+                    yield current, len(steps) - 1, current_h, 1
+                children = heuristic.expand(current, current_h, parent)
+                generated += len(children)
+                best_h = min(child_h for _, child_h in children)
+                if best_h < current_h:
+                    flat = 0
+                elif best_h == current_h and flat < sideways:
+                    flat += 1
+                else:
+                    stats.plateaus += 1
+                    break
+                parent = current
+                current, current_h = rng.choice([child for child in children if child[1] == best_h])
+                steps.append(current)
+            if current == goal:
+                return unpack_path(loop_free(steps), board)
         return None
-    for child in generate_children(state):
-        child_hst = hst(child)
-        if child_hst not in visited:
-            visited.add(child_hst)
-            path[child_hst] = state
-            result = deepening(child, depth - 1, visited, path)
-            if result:
-                return result
-            path.pop(child_hst)
-    return None
+    finally:
+        stats.add(expanded, generated, 0, 1)
+
+
+def hill_restarts(start_state, heuristic=None, sideways=50, evaluations=DEFAULT_EVALUATIONS, seed=None, stats=None, budget=None):
+    return drain(hill_restarts_events(start_state, heuristic, sideways, evaluations, seed, stats, budget, trace=False))
+
+
+def simulated_annealing_events(start_state, heuristic=None, schedule="exponential", temperature=2.0, evaluations=DEFAULT_EVALUATIONS, seed=None, stats=None, budget=None, trace=True):
+    # Scores one random neighbour per step and takes it if it is no worse, or with
+    # probability exp(-increase / T) otherwise. `schedule` names a COOLING entry or is
+    # a function of the step giving T; the run ends at the goal, when T reaches zero or
+    # when the evaluations are spent.
+    stats = stats or SearchStats()
+    check_at = budget.start() if budget is not None else -1
+    on_expand = stats.on_expand
+    rng = random.Random(seed) if seed is not None else random
+    board = get_board(len(start_state))
+    heuristic = get_heuristic(heuristic, board)
+    cool = schedule if callable(schedule) else lambda step: COOLING[schedule](temperature, step, evaluations)
+    start = board.pack(start_state)
+    goal = board.goal_code
+    steps = [start]
+    current = start
+    current_h = heuristic(current)
+    step = 0
+    try:
+        while current != goal and step < evaluations:
+            if step == check_at:
+                check_at = budget.check(step, len(steps))
+            step += 1
+            if on_expand is not None:
+                on_expand(current)
+            if trace:
+                yield current, len(steps) - 1, current_h, 1
+            t = cool(step)
+            if t <= 0:
+                break
+            child, child_h = rng.choice(heuristic.expand(current, current_h))
+            if child_h <= current_h or rng.random() < math.exp((current_h - child_h) / t):
+                current, current_h = child, child_h
+                steps.append(current)
+        if current == goal:
+            return unpack_path(loop_free(steps), board)
+        stats.plateaus += 1
+        return None
+    finally:
+        stats.add(step, step, 0, 1)
 
 
-def iddfs(start_state, max_depth=50):
+def simulated_annealing(start_state, heuristic=None, schedule="exponential", temperature=2.0, evaluations=DEFAULT_EVALUATIONS, seed=None, stats=None, budget=None):
+    return drain(simulated_annealing_events(start_state, heuristic, schedule, temperature, evaluations, seed, stats, budget, trace=False))
+
+
+def beam_search_events(start_state, heuristic=None, width=16, evaluations=DEFAULT_EVALUATIONS, seed=None, stats=None, budget=None, trace=True):
+    # Local beam search: every layer keeps the `width` unseen children with the lowest h
+    # (ties broken at random) out of all children of the previous layer.
+    stats = stats or SearchStats()
+    check_at = budget.start() if budget is not None else -1
+    on_expand = stats.on_expand
+    rng = random.Random(seed) if seed is not None else random
+    board = get_board(len(start_state))
+    heuristic = get_heuristic(heuristic, board)
+    start = board.pack(start_state)
+    goal = board.goal_code
+    if start == goal:
+        return unpack_path([start], board)
+    path = {start: None}
+    layer = [(heuristic(start), 0, start)]
     depth = 0
-    while depth <= max_depth:
-        visited = set()
-        visited.add(hst(start_state))
-        path = {hst(start_state): None}
-        result = deepening(start_state, depth, visited, path)
-        if result:
-            return result
-        depth += 1
-    return None
+    expanded = generated = duplicates = 0
+    try:
+        while layer and generated < evaluations:
+            candidates = []
+            for h, _, current in layer:
+                if expanded == check_at:
+                    check_at = budget.check(expanded, len(path))
+                expanded += 1
+                if on_expand is not None:
+                    on_expand(current)
+                if trace:
+                    yield current, depth, h, len(layer)
+                children = heuristic.expand(current, h)
+                generated += len(children)
+                for child, child_h in children:
+                    if child in path:
+                        duplicates += 1
+                        continue
+                    path[child] = current
+                    if child == goal:
+                        return re_path(path, child, board)
+                    candidates.append((child_h, rng.random(), child))
+            layer = nsmallest(width, candidates)
+            depth += 1
+        stats.plateaus += not layer
+        return None
+    finally:
+        stats.add(expanded, generated, duplicates, width)
 
 
-def dfs(start_state, max_depth=100):
-    stack = [(start_state, 0)]
-    visited = set()
-    visited.add(hst(start_state))
-    path = {hst(start_state): None}
-    while stack:
-        current, depth = stack.pop()
-        if is_goal(current):
-            return re_path(path, current)
-        if depth < max_depth:
-            for child in generate_children(current):
-                child_hst = hst(child)
-                if child_hst not in visited:
-                    visited.add(child_hst)
-                    stack.append((child, depth + 1))
-                    path[child_hst] = current
-    return None
+def beam_search(start_state, heuristic=None, width=16, evaluations=DEFAULT_EVALUATIONS, seed=None, stats=None, budget=None):
+    return drain(beam_search_events(start_state, heuristic, width, evaluations, seed, stats, budget, trace=False))
+
+
+def tabu_search_events(start_state, heuristic=None, tenure=32, evaluations=DEFAULT_EVALUATIONS, seed=None, stats=None, budget=None, trace=True):
+    # Always moves to the best neighbour that is not tabu, even uphill; the last `tenure`
+    # states are tabu. They are held as TABU_BITS-bit hashes: a ring of the recent ones
+    # and a count per hash value, so membership is one index into a small bytearray
+    # (a colliding hash only ever makes an extra state tabu).
+    stats = stats or SearchStats()
+    check_at = budget.start() if budget is not None else -1
+    on_expand = stats.on_expand
+    rng = random.Random(seed) if seed is not None else random
+    board = get_board(len(start_state))
+    heuristic = get_heuristic(heuristic, board)
+    start = board.pack(start_state)
+    goal = board.goal_code
+    counts = bytearray(1 << TABU_BITS)
+    ring = array("H", bytes(2 * tenure))
+    steps = [start]
+    current = start
+    current_h = heuristic(current)
+    expanded = generated = 0
+    try:
+        while current != goal and generated < evaluations:
+            if expanded == check_at:
+                check_at = budget.check(expanded, len(steps))
+            if trace:
+                yield current, len(steps) - 1, current_h, 1
+            slot = expanded % tenure
+            if expanded >= tenure:
+                counts[ring[slot]] -= 1
+            key = tabu_key(current)
+            ring[slot] = key
+            counts[key] += 1
+            expanded += 1
+            if on_expand is not None:
+                on_expand(current)
+            children = heuristic.expand(current, current_h)
+            generated += len(children)
+            best = None
+            for child, child_h in children:
+                if counts[tabu_key(child)] and child != goal:
+                    continue
+                if best is None or child_h < best[1] or child_h == best[1] and rng.random() < 0.5:
+                    best = child, child_h
+            if best is None:  # boxed in by the tabu list: the best neighbour is taken anyway
+                stats.plateaus += 1
+                best = min(children, key=lambda child: child[1])
+            current, current_h = best
+            steps.append(current)
+        if current == goal:
+            return unpack_path(loop_free(steps), board)
+        return None
+    finally:
+        stats.add(expanded, generated, 0, 1)
+
+
+def tabu_search(start_state, heuristic=None, tenure=32, evaluations=DEFAULT_EVALUATIONS, seed=None, stats=None, budget=None):
+    return drain(tabu_search_events(start_state, heuristic, tenure, evaluations, seed, stats, budget, trace=False))
+
+
+LOCAL_SEARCHES = {
+    "hill_restarts": hill_restarts,
+    "simulated_annealing": simulated_annealing,
+    "beam_search": beam_search,
+    "tabu_search": tabu_search,
+}
+
+
+def bfs_events(start_state, stats=None, budget=None, compact=False, goal=None, trace=True):
+    stats = stats or SearchStats()
+    check_at = budget.start() if budget is not None else -1
+    on_expand = stats.on_expand
+    board = get_board(len(start_state))
+    start = board.pack(start_state)
+    goal = board.goal_code if goal is None else board.pack(goal)
+    queue = deque([start])
+    path = parent_table(board, start, compact)  # doubles as the visited set
+    expanded = generated = max_frontier = 0
+    depth = 0
+    layer_left = 1  # states of the current depth still queued
+    try:
+        while queue:
+            if len(queue) > max_frontier:
+                max_frontier = len(queue)
+            if layer_left == 0:
+                depth += 1
+                layer_left = len(queue)
+            layer_left -= 1
+            current = queue.popleft()
+            if current == goal:
+                return re_path(path, current, board)
+            if expanded == check_at:
+                check_at = budget.check(expanded, len(path))
+            expanded += 1
+            if on_expand is not None:
+                on_expand(current)
+            if trace:
+                yield current, depth, None, len(queue)
+            children = board.children(current)
+            generated += len(children)
+            for child in children:
+                if child not in path:
+                    queue.append(child)
+                    path[child] = current
+        return None
+    finally:
+        stats.add(expanded, generated, generated - len(path) + 1, max_frontier)
+
+
+def bfs(start_state, stats=None, budget=None, compact=False, goal=None):
+    # 3x3 boards go to the NumPy engine when it is installed, unless an on_expand hook
+    # needs to see the states one by one
+    engine = layer_engine()
+    if engine is not None and len(start_state) == 3 and not compact and goal is None and (stats is None or stats.on_expand is None):
+        return engine.bfs(start_state, stats, budget)
+    return drain(bfs_events(start_state, stats, budget, compact, goal, trace=False))
+
+
+def layer_engine():  # the Vectorized module, or None without NumPy
+    import Vectorized  # imports this module, so not at the top
+
+    return Vectorized if Vectorized.np is not None else None
+
+
+def ucs_events(start_state, stats=None, budget=None, compact=False, goal=None, trace=True):
+    stats = stats or SearchStats()
+    check_at = budget.start() if budget is not None else -1
+    on_expand = stats.on_expand
+    board = get_board(len(start_state))
+    start = board.pack(start_state)
+    goal = board.goal_code if goal is None else board.pack(goal)
+    pq = []
+    heappush(pq, (0, start))
+    visited = cost_table(board, start, compact)
+    path = parent_table(board, start, compact)
+    expanded = generated = duplicates = max_frontier = 0
+    try:
+        while pq:
+            if len(pq) > max_frontier:
+                max_frontier = len(pq)
+            cost, current = heappop(pq)
+            if current == goal:
+                return re_path(path, current, board)
+            if expanded == check_at:
+                check_at = budget.check(expanded, len(visited) + len(pq))
+            expanded += 1
+            if on_expand is not None:
+                on_expand(current)
+            if trace:
+                yield current, cost, None, len(pq)
+            children = board.children(current)
+            generated += len(children)
+            for child in children:
+                new_cost = cost + 1
+                if child not in visited or new_cost < visited[child]:
+                    visited[child] = new_cost
+                    heappush(pq, (new_cost, child))
+                    path[child] = current
+                else:
+                    duplicates += 1
+        return None
+    finally:
+        stats.add(expanded, generated, duplicates, max_frontier)
+
+
+def ucs(start_state, stats=None, budget=None, compact=False, goal=None):
+    return drain(ucs_events(start_state, stats, budget, compact, goal, trace=False))
+
+
+def iddfs_events(start_state, max_depth=50, stats=None, budget=None, trace=True):
+    # Each pass is a depth-limited DFS on an explicit stack of (state, depth left,
+    # children) frames. As in the recursive version it replaces, a state reached once
+    # in a pass is not entered again in that pass, and path holds the current branch.
+    stats = stats or SearchStats()
+    check_at = budget.start() if budget is not None else -1
+    on_expand = stats.on_expand
+    board = get_board(len(start_state))
+    start = board.pack(start_state)
+    goal = board.goal_code
+    expanded = generated = duplicates = max_frontier = 0
+    depth = 0
+    try:
+        while depth <= max_depth:
+            stats.iterations += 1
+            if stats.on_iteration is not None:
+                stats.on_iteration(stats.iterations, depth)
+            visited = {start}
+            path = {start: None}
+            frames = []
+            state, left = start, depth
+            while state is not None:
+                if state == goal:
+                    return re_path(path, state, board)
+                if left > 0:
+                    if expanded == check_at:
+                        check_at = budget.check(expanded, len(visited))
+                    expanded += 1
+                    if len(path) > max_frontier:
+                        max_frontier = len(path)
+                    if on_expand is not None:
+                        on_expand(state)
+                    if trace:
+                        yield state, depth - left, None, len(path)
+                    children = board.children(state)
+                    generated += len(children)
+                    frames.append((state, left - 1, iter(children)))
+                elif frames:
+                    del path[state]
+                state = None
+                while frames:
+                    parent, left, children = frames[-1]
+                    for child in children:
+                        if child not in visited:
+                            visited.add(child)
+                            path[child] = parent
+                            state = child
+                            break
+                        duplicates += 1
+                    if state is not None:
+                        break
+                    frames.pop()
+                    if frames:
+                        del path[parent]
+            depth += 1
+        return None
+    finally:
+        stats.add(expanded, generated, duplicates, max_frontier)
+
+
+def iddfs(start_state, max_depth=50, stats=None, budget=None):
+    return drain(iddfs_events(start_state, max_depth, stats, budget, trace=False))
+
+
+def dfs_events(start_state, max_depth=100, stats=None, budget=None, compact=False, trace=True):
+    stats = stats or SearchStats()
+    check_at = budget.start() if budget is not None else -1
+    on_expand = stats.on_expand
+    board = get_board(len(start_state))
+    start = board.pack(start_state)
+    goal = board.goal_code
+    stack = [(start, 0)]
+    path = parent_table(board, start, compact)
+    expanded = generated = max_frontier = 0
+    try:
+        while stack:
+            if len(stack) > max_frontier:
+                max_frontier = len(stack)
+            current, depth = stack.pop()
+            if current == goal:
+                return re_path(path, current, board)
+            if depth < max_depth:
+                if expanded == check_at:
+                    check_at = budget.check(expanded, len(path))
+                expanded += 1
+                if on_expand is not None:
+                    on_expand(current)
+                if trace:
+                    yield current, depth, None, len(stack)
+                children = board.children(current)
+                generated += len(children)
+                for child in children:
+                    if child not in path:
+                        stack.append((child, depth + 1))
+                        path[child] = current
+        return None
+    finally:
+        stats.add(expanded, generated, generated - len(path) + 1, max_frontier)
+
+
+def dfs(start_state, max_depth=100, stats=None, budget=None, compact=False):
+    return drain(dfs_events(start_state, max_depth, stats, budget, compact, trace=False))
 
 
 def manhattan_distance(state):  # Day la tong chi phi cua tat ca cac 1,2,3,... de ve vi tri chinh xac cua no o state hien tai
+    size = len(state)
     distance = 0
-    for i in range(3):
-        for j in range(3):
+    for i in range(size):
+        for j in range(size):
             value = state[i][j]
             if value != 0:
-                target_x, target_y = divmod(value - 1, 3)
+                target_x, target_y = divmod(value - 1, size)
                 distance += abs(target_x - i) + abs(target_y - j)
     return distance
 
 
-def gbfs(start_state):
-    pq = []
-    heappush(pq, (manhattan_distance(start_state), start_state))
-    visited = set()
-    visited.add(hst(start_state))
-    path = {hst(start_state): None}
-    while pq:
-        _, current = heappop(pq)
-        if is_goal(current):
-            return re_path(path, current)
-        for child in generate_children(current):
-            child_hst = hst(child)
-            if child_hst not in visited:
-                visited.add(child_hst)
-                heappush(pq, (manhattan_distance(child), child))
-                path[child_hst] = current
-    return None
+def line_conflicts(tiles, goal_lines, goal_places, line):
+    # tiles lying in their goal line must end in goal order; every tile that has to
+    # step aside for that costs two extra moves (2 * (count - longest ordered run))
+    places = [goal_places[tile] for tile in tiles if tile != 0 and goal_lines[tile] == line]
+    longest = [1] * len(places)
+    for i in range(len(places)):
+        for j in range(i):
+            if places[j] < places[i] and longest[j] + 1 > longest[i]:
+                longest[i] = longest[j] + 1
+    return 2 * (len(places) - max(longest, default=0))
+
+
+def build_walking_distance_table(size=3, blank_line=None):
+    # Abstract puzzle: counts[line * size + goal_line] tiles of each goal row sit in
+    # each row; the blank swaps rows with one tile per move. Columns give the same
+    # puzzle, so one table serves both directions when the blank's goal row and column
+    # (`blank_line`, the last line by default) agree.
+    if blank_line is None:
+        blank_line = size - 1
+    goal = [0] * (size * size)
+    for line in range(size):
+        goal[line * (size + 1)] = size - (line == blank_line)
+    goal_key = tuple(goal) + (blank_line,)
+    table = {goal_key: 0}
+    queue = deque([goal_key])
+    while queue:
+        key = queue.popleft()
+        counts, blank = key[:-1], key[-1]
+        for line in (blank - 1, blank + 1):
+            if not 0 <= line < size:
+                continue
+            for goal_line in range(size):
+                if counts[line * size + goal_line]:
+                    moved = list(counts)
+                    moved[line * size + goal_line] -= 1
+                    moved[blank * size + goal_line] += 1
+                    child = tuple(moved) + (line,)
+                    if child not in table:
+                        table[child] = table[key] + 1
+                        queue.append(child)
+    return table
+
+
+PATTERNS = {
+    3: ((1, 2, 3, 4), (5, 6, 7, 8)),
+    4: ((1, 2, 3, 5, 6), (4, 7, 8, 11, 12), (9, 10, 13, 14, 15)),
+}
+
+
+def pattern_file(board, pattern):
+    return os.path.join(DATA_DIR, f"pdb-{board.size}x{board.size}-" + "-".join(map(str, pattern)) + ".bin")
+
+
+def build_pattern_table(board, pattern):
+    # BFS over (pattern tile positions, region the blank can roam without moving a
+    # pattern tile). Only moves of pattern tiles are counted, which is what lets
+    # disjoint patterns be added together.
+    cells = board.cells
+    positions = board.tile_positions(board.goal_code)
+    weights = [cells**slot for slot in range(len(pattern))]
+    table = bytearray([UNSEEN]) * (cells ** len(pattern))
+    seen = bytearray(len(table) * cells)
+    layer = [sum(positions[tile] * weight for tile, weight in zip(pattern, weights)) * cells + positions[0]]
+    depth = 0
+    while layer:
+        next_layer = []
+        for key in layer:
+            if seen[key]:
+                continue
+            index, blank = divmod(key, cells)
+            occupied = {}
+            rest = index
+            for slot in range(len(pattern)):
+                rest, cell = divmod(rest, cells)
+                occupied[cell] = slot
+            region = [blank]
+            seen[key] = 1
+            if table[index] == UNSEEN:
+                table[index] = depth
+            for cell in region:
+                for neighbour in board.neighbours[cell]:
+                    slot = occupied.get(neighbour)
+                    if slot is None:
+                        if not seen[index * cells + neighbour]:
+                            seen[index * cells + neighbour] = 1
+                            region.append(neighbour)
+                    else:
+                        next_layer.append((index + (cell - neighbour) * weights[slot]) * cells + neighbour)
+        layer = next_layer
+        depth += 1
+    write_file(pattern_file(board, pattern), table)
+    return table
+
+
+def load_pattern_table(board, pattern):
+    filename = pattern_file(board, pattern)
+    if not os.path.exists(filename):
+        return build_pattern_table(board, pattern)
+    with open(filename, "rb") as file:
+        return file.read()
+
+
+def pattern_symmetry(board, patterns, positions):
+    # (source, patterns): the grid symmetry, as in grid_symmetries, under which the
+    # pattern tables cover most tiles of the layout with tile `positions`, and the
+    # patterns they cover there. A pattern counts when the layout's blank lies outside
+    # its goal cells and in the region of the other cells that the table's goal blank
+    # is in, since the table measured its distances towards that region.
+    goal_positions = board.goal_positions
+    best = None
+    for source in grid_symmetries(board.size):
+        cell_map = [0] * board.cells
+        for index, cell in enumerate(source):
+            cell_map[cell] = index
+        blank = cell_map[positions[0]]
+        covered = []
+        for pattern in patterns:
+            blocked = {goal_positions[tile] for tile in pattern}
+            if blank in blocked:
+                continue
+            region = {blank}
+            frontier = [blank]
+            while frontier:
+                for neighbour in board.neighbours[frontier.pop()]:
+                    if neighbour not in blocked and neighbour not in region:
+                        region.add(neighbour)
+                        frontier.append(neighbour)
+            if goal_positions[0] in region:
+                covered.append(pattern)
+        if best is None or sum(map(len, covered)) > sum(map(len, best[1])):
+            best = source, covered
+    return best
+
+
+class Heuristic:
+    # Scores codes against `target`, the board's goal unless another code is given.
+    def __init__(self, board=BOARD, target=None):
+        self.board = board
+        self.target = board.goal_code if target is None else target
+        self.positions = board.tile_positions(self.target)
+        self.moves = board.moves if target is None else build_move_tables(board, target)[2]
+
+    def __call__(self, code):
+        raise NotImplementedError
 
+    def expand(self, code, h, parent=None):  # children paired with their h; subclasses make this incremental
+        return [(child, self(child)) for child in self.board.children(code) if child != parent]
 
-def A_star(start_state):
+
+class Manhattan(Heuristic):
+    def __init__(self, board=BOARD, target=None):
+        super().__init__(board, target)
+        if target is None:
+            self.expand = board.expand
+
+    def __call__(self, code):
+        return self.board.manhattan(code, positions=self.positions)
+
+    def expand(self, code, h, parent=None):
+        return self.board.expand(code, h, parent, self.moves)
+
+
+class LinearConflict(Heuristic):
+    def __init__(self, board=BOARD, target=None):
+        super().__init__(board, target)
+        size, bits = board.size, board.cell_bits
+        self.goal_rows = [position // size for position in self.positions]
+        self.goal_cols = [position % size for position in self.positions]
+        self.row_mask = (1 << (size * bits)) - 1
+        self.col_shifts = [[(row * size + col) * bits for row in range(size)] for col in range(size)]
+        self.row_memo = [{} for _ in range(size)]  # line content -> extra moves, filled as met
+        self.col_memo = [{} for _ in range(size)]
+
+    def row_conflicts(self, code, row):
+        content = (code >> (row * self.board.size * self.board.cell_bits)) & self.row_mask
+        extra = self.row_memo[row].get(content)
+        if extra is None:
+            tiles = [(content >> (j * self.board.cell_bits)) & self.board.cell_mask for j in range(self.board.size)]
+            extra = self.row_memo[row][content] = line_conflicts(tiles, self.goal_rows, self.goal_cols, row)
+        return extra
+
+    def col_conflicts(self, code, col):
+        tiles = tuple((code >> shift) & self.board.cell_mask for shift in self.col_shifts[col])
+        extra = self.col_memo[col].get(tiles)
+        if extra is None:
+            extra = self.col_memo[col][tiles] = line_conflicts(tiles, self.goal_cols, self.goal_rows, col)
+        return extra
+
+    def __call__(self, code):
+        extra = sum(self.row_conflicts(code, line) + self.col_conflicts(code, line) for line in range(self.board.size))
+        return self.board.manhattan(code, positions=self.positions) + extra
+
+    def expand(self, code, h, parent=None):
+        # a sideways move only reorders two columns, a vertical one only two rows
+        board = self.board
+        blank = code >> board.blank_shift
+        blank_row, blank_col = divmod(blank, board.size)
+        children = []
+        for shift, mult, flip, delta in self.moves[blank]:
+            tile = (code >> shift) & board.cell_mask
+            child = code ^ tile * mult ^ flip
+            if child == parent:
+                continue
+            row, col = divmod(shift // board.cell_bits, board.size)
+            if row == blank_row:
+                lines, a, b = self.col_conflicts, col, blank_col
+            else:
+                lines, a, b = self.row_conflicts, row, blank_row
+            children.append((child, h + delta[tile] + lines(child, a) + lines(child, b) - lines(code, a) - lines(code, b)))
+        return children
+
+
+class WalkingDistance(Heuristic):
+    def __init__(self, board=BOARD, target=None):
+        super().__init__(board, target)
+        blank_row, blank_col = divmod(self.positions[0], board.size)
+        self.row_table = build_walking_distance_table(board.size, blank_row)
+        self.col_table = self.row_table if blank_col == blank_row else build_walking_distance_table(board.size, blank_col)
+        self.goal_rows = [position // board.size for position in self.positions]
+        self.goal_cols = [position % board.size for position in self.positions]
+
+    def __call__(self, code):
+        board = self.board
+        size = board.size
+        rows = [0] * board.cells
+        cols = [0] * board.cells
+        for index in range(board.cells):
+            tile = (code >> (index * board.cell_bits)) & board.cell_mask
+            if tile != 0:
+                row, col = divmod(index, size)
+                rows[row * size + self.goal_rows[tile]] += 1
+                cols[col * size + self.goal_cols[tile]] += 1
+        row, col = divmod(code >> board.blank_shift, size)
+        return self.row_table[tuple(rows) + (row,)] + self.col_table[tuple(cols) + (col,)]
+
+
+class PatternDatabase(Heuristic):
+    # Towards another target the same tables are read through the grid symmetry of
+    # pattern_symmetry, each pattern slot going to the target's tile on the cell mapped
+    # onto that slot's goal cell. Tiles no pattern covers there add their Manhattan
+    # distance, which sums with the tables as every part counts its own tiles' moves.
+    def __init__(self, board=BOARD, patterns=None, target=None):
+        super().__init__(board, target)
+        source, self.patterns = pattern_symmetry(board, patterns or PATTERNS[board.size], self.positions)
+        self.tables = [load_pattern_table(board, pattern) for pattern in self.patterns]
+        cell_map = [0] * board.cells
+        for index, cell in enumerate(source):
+            cell_map[cell] = index
+        self.owners = [None] * board.cells
+        self.weights = [0] * board.cells
+        for number, pattern in enumerate(self.patterns):
+            for slot, tile in enumerate(pattern):
+                held = (self.target >> (source[board.goal_positions[tile]] * board.cell_bits)) & board.cell_mask
+                self.owners[held] = number
+                self.weights[held] = board.cells**slot
+        # rest[tile][cell]: Manhattan distance of an uncovered tile, 0 for the others
+        self.rest = [[0] * board.cells for _ in range(board.cells)]
+        for tile in range(1, board.cells):
+            if self.owners[tile] is None:
+                target_x, target_y = divmod(self.positions[tile], board.size)
+                for cell in range(board.cells):
+                    x, y = divmod(cell, board.size)
+                    self.rest[tile][cell] = abs(target_x - x) + abs(target_y - y)
+        self.covers_all = all(owner is not None for owner in self.owners[1:])
+        # pattern_moves[blank]: (shift, mult, flip, Manhattan delta of uncovered tiles, mapped cell step)
+        self.pattern_moves = [
+            tuple(
+                (shift, mult, flip, tuple(step if self.owners[tile] is None else 0 for tile, step in enumerate(delta)), cell_map[blank] - cell_map[shift // board.cell_bits])
+                for shift, mult, flip, delta in moves
+            )
+            for blank, moves in enumerate(self.moves)
+        ]
+        # All pattern indices are packed side by side into one int, summed from
+        # per-chunk tables that each cover 16 bits worth of cells.
+        self.field = max((len(table) - 1 for table in self.tables), default=1).bit_length()
+        self.field_mask = (1 << self.field) - 1
+        self.offsets = [number * self.field for number in range(len(self.patterns))]
+        per_chunk = max(1, 16 // board.cell_bits)
+        self.chunks = []
+        for first in range(0, board.cells, per_chunk):
+            cells = range(first, min(first + per_chunk, board.cells))
+            table = array("Q", bytes(8 << (len(cells) * board.cell_bits)))
+            for content in range(len(table)):
+                combined = 0
+                for slot, cell in enumerate(cells):
+                    tile = (content >> (slot * board.cell_bits)) & board.cell_mask
+                    if tile < board.cells and self.owners[tile] is not None:
+                        combined += (cell_map[cell] * self.weights[tile]) << self.offsets[self.owners[tile]]
+                table[content] = combined
+            self.chunks.append((first * board.cell_bits, (1 << (len(cells) * board.cell_bits)) - 1, table))
+
+    def combined(self, code):
+        combined = 0
+        for shift, mask, table in self.chunks:
+            combined += table[(code >> shift) & mask]
+        return combined
+
+    def __call__(self, code):
+        combined = self.combined(code)
+        h = sum(table[(combined >> offset) & self.field_mask] for table, offset in zip(self.tables, self.offsets))
+        if not self.covers_all:
+            board = self.board
+            h += sum(self.rest[(code >> (index * board.cell_bits)) & board.cell_mask][index] for index in range(board.cells))
+        return h
+
+    def expand(self, code, h, parent=None):
+        board = self.board
+        combined = self.combined(code)
+        children = []
+        for shift, mult, flip, delta, step in self.pattern_moves[code >> board.blank_shift]:
+            tile = (code >> shift) & board.cell_mask
+            child = code ^ tile * mult ^ flip
+            if child == parent:
+                continue
+            child_h = h + delta[tile]
+            number = self.owners[tile]
+            if number is not None:
+                table = self.tables[number]
+                index = (combined >> self.offsets[number]) & self.field_mask
+                child_h += table[index + step * self.weights[tile]] - table[index]
+            children.append((child, child_h))
+        return children
+
+
+HEURISTICS = {"manhattan": Manhattan, "linear_conflict": LinearConflict, "walking_distance": WalkingDistance, "pdb": PatternDatabase}
+DEFAULT_HEURISTICS = {3: "manhattan", 4: "pdb"}  # larger boards fall back to linear_conflict
+heuristic_cache = {}
+
+
+def get_heuristic(heuristic=None, board=BOARD, target=None):  # accepts a name from HEURISTICS or a Heuristic instance
+    if target == board.goal_code:
+        target = None
+    if isinstance(heuristic, Heuristic):
+        if heuristic.target != (board.goal_code if target is None else target):
+            raise ValueError("the heuristic measures against another goal")
+        return heuristic
+    if heuristic is None:
+        heuristic = DEFAULT_HEURISTICS.get(board.size, "linear_conflict")
+    key = (heuristic, board.size, target)
+    if key not in heuristic_cache:
+        heuristic_cache[key] = HEURISTICS[heuristic](board, target=target)
+    return heuristic_cache[key]
+
+
+def gbfs_events(start_state, heuristic=None, stats=None, budget=None, compact=False, trace=True):
+    stats = stats or SearchStats()
+    check_at = budget.start() if budget is not None else -1
+    on_expand = stats.on_expand
+    board = get_board(len(start_state))
+    heuristic = get_heuristic(heuristic, board)
+    start = board.pack(start_state)
+    goal = board.goal_code
     pq = []
-    heappush(pq, (manhattan_distance(start_state), start_state))
-    visited = set()
-    visited.add(hst(start_state))
-    path = {hst(start_state): None}
-    while pq:
-        _, current = heappop(pq)
-        if is_goal(current):
-            return re_path(path, current)
-        for child in generate_children(current):
-            child_hst = hst(child)
-            if child_hst not in visited:
-                visited.add(child_hst)
-                heappush(pq, (manhattan_distance(child) + 1, child))
-                path[child_hst] = current
-    return None
+    order = board.order
+    heappush(pq, (heuristic(start), order(start), start, 0))  # ties go to the smaller board, row by row
+    path = parent_table(board, start, compact)
+    expanded = generated = duplicates = max_frontier = 0
+    try:
+        while pq:
+            if len(pq) > max_frontier:
+                max_frontier = len(pq)
+            h, _, current, g = heappop(pq)
+            if current == goal:
+                return re_path(path, current, board)
+            if expanded == check_at:
+                check_at = budget.check(expanded, len(path) + len(pq))
+            expanded += 1
+            if on_expand is not None:
+                on_expand(current)
+            if trace:
+                yield current, g, h, len(pq)
+            children = heuristic.expand(current, h)
+            generated += len(children)
+            for child, child_h in children:
+                if child not in path:
+                    heappush(pq, (child_h, order(child), child, g + 1))
+                    path[child] = current
+                else:
+                    duplicates += 1
+        return None
+    finally:
+        stats.add(expanded, generated, duplicates, max_frontier)
 
 
-def ida_search(path, g, threshold):
-    current = path[-1]
-    f = g + manhattan_distance(current)
-    if f > threshold:
-        return f
-    if is_goal(current):
-        return list(path)
-    minimum = float("inf")
-    for child in generate_children(current):
-        if any(hst(child) == hst(p) for p in path):
-            continue
-        path.append(child)
-        temp = ida_search(path, g + 1, threshold)
-        if isinstance(temp, list):
-            return temp
-        if temp < minimum:
-            minimum = temp
-        path.pop()
-    return minimum
+def gbfs(start_state, heuristic=None, stats=None, budget=None, compact=False):
+    return drain(gbfs_events(start_state, heuristic, stats, budget, compact, trace=False))
+
+
+def A_star_events(start_state, heuristic=None, stats=None, budget=None, compact=False, goal=None, trace=True):
+    # Entries are (f, -g, count, h, code): ties on f go to the deeper node, then to the
+    # newer one, so the heap never compares states. Stale entries are skipped when popped
+    # (lazy deletion), and a closed node is reopened whenever a cheaper path reaches it,
+    # which keeps paths optimal with the inconsistent pattern databases too.
+    stats = stats or SearchStats()
+    check_at = budget.start() if budget is not None else -1
+    on_expand = stats.on_expand
+    board = get_board(len(start_state))
+    start = board.pack(start_state)
+    goal = board.goal_code if goal is None else board.pack(goal)
+    heuristic = get_heuristic(heuristic, board, goal)
+    start_h = heuristic(start)
+    pq = [(start_h, 0, 0, start_h, start)]
+    cost = cost_table(board, start, compact)
+    path = parent_table(board, start, compact)
+    count = 0
+    expanded = generated = stale = max_frontier = 0
+    try:
+        while pq:
+            if len(pq) > max_frontier:
+                max_frontier = len(pq)
+            _, g, _, h, current = heappop(pq)
+            g = -g
+            if g > cost[current]:
+                stale += 1
+                continue
+            if current == goal:
+                return re_path(path, current, board)
+            if expanded == check_at:
+                check_at = budget.check(expanded, len(cost) + len(pq))
+            expanded += 1
+            if on_expand is not None:
+                on_expand(current)
+            if trace:
+                yield current, g, h, len(pq)
+            new_cost = g + 1
+            children = heuristic.expand(current, h)
+            generated += len(children)
+            for child, child_h in children:
+                if new_cost < cost.get(child, new_cost + 1):
+                    cost[child] = new_cost
+                    path[child] = current
+                    count -= 1
+                    heappush(pq, (new_cost + child_h, -new_cost, count, child_h, child))
+        return None
+    finally:
+        stats.add(expanded, generated, stale + generated + count, max_frontier)  # count went down once per push
+
+
+def A_star(start_state, heuristic=None, stats=None, budget=None, compact=False, goal=None):
+    return drain(A_star_events(start_state, heuristic, stats, budget, compact, goal, trace=False))
+
+
+def ara_star_paths(start_state, heuristic=None, weight=3.0, decrement=0.5, stats=None, budget=None):
+    # Anytime Repairing A*: weighted A* passes with f = g + w * h, w lowered by
+    # `decrement` after each pass down to 1. A pass expands every state at most once;
+    # states whose g improves after they were expanded wait in `incons` and rejoin the
+    # open list for the next pass, so each pass starts from the previous one's work.
+    # Yields (path, bound) for every shorter path, bound being how many times longer
+    # than the optimum it can be at most: the path's length over the smallest g + h
+    # waiting in the open list or `incons`, where some state of an optimal path always
+    # waits. It ends once that is 1, so with an inconsistent heuristic such as pdb the
+    # passes at weight 1 go on until the reopened states settle.
+    stats = stats or SearchStats()
+    check_at = budget.start() if budget is not None else -1
+    on_expand = stats.on_expand
+    board = get_board(len(start_state))
+    heuristic = get_heuristic(heuristic, board)
+    start = board.pack(start_state)
+    goal = board.goal_code
+    cost = {start: 0}
+    path = {start: None}
+    opened = {start: heuristic(start)}  # code -> h for the open list; the heap may hold stale entries too
+    incons = {}
+    best = float("inf")
+    count = 0
+    expanded = generated = duplicates = max_frontier = 0
+    try:
+        while True:
+            stats.iterations += 1
+            if stats.on_iteration is not None:
+                stats.on_iteration(stats.iterations, weight)
+            opened.update(incons)
+            incons = {}
+            pq = [(cost[code] + weight * h, -cost[code], code) for code, h in opened.items()]
+            heapify(pq)
+            closed = set()
+            while pq and pq[0][0] < cost.get(goal, best):
+                if len(pq) > max_frontier:
+                    max_frontier = len(pq)
+                _, g, current = heappop(pq)
+                g = -g
+                if current in closed or g != cost[current]:
+                    duplicates += 1
+                    continue
+                h = opened.pop(current)
+                closed.add(current)
+                if expanded == check_at:
+                    check_at = budget.check(expanded, len(cost) + len(pq))
+                expanded += 1
+                if on_expand is not None:
+                    on_expand(current)
+                new_cost = g + 1
+                children = heuristic.expand(current, h)
+                generated += len(children)
+                for child, child_h in children:
+                    if new_cost < cost.get(child, new_cost + 1):
+                        cost[child] = new_cost
+                        path[child] = current
+                        if child in closed:
+                            incons[child] = child_h
+                        else:
+                            opened[child] = child_h
+                            heappush(pq, (new_cost + weight * child_h, -new_cost, child))
+            if goal not in cost:
+                return
+            lowest = min([cost[code] + h for code, h in opened.items()] + [cost[code] + h for code, h in incons.items()], default=cost[goal])
+            bound = cost[goal] / lowest if lowest else 1.0
+            if cost[goal] < best:
+                best = cost[goal]
+                yield re_path(path, goal, board), max(bound, 1.0)
+            if bound <= 1:
+                return
+            weight = max(1.0, weight - decrement)
+    finally:
+        stats.add(expanded, generated, duplicates, max_frontier)
 
 
-def ida_star(start_state):
-    threshold = manhattan_distance(start_state)
-    path = [start_state]
+def ara_star(start_state, heuristic=None, weight=3.0, decrement=0.5, stats=None, budget=None):
+    # The last path of ara_star_paths, each one also handed to stats.on_solution(path,
+    # bound). When the budget runs out after a first path, that path is returned with
+    # stats.exhausted set instead of raising.
+    stats = stats or SearchStats()
+    solution = None
+    try:
+        for solution, bound in ara_star_paths(start_state, heuristic, weight, decrement, stats, budget):
+            if stats.on_solution is not None:
+                stats.on_solution(solution, bound)
+    except BudgetExhausted as exhausted:
+        if solution is None:
+            raise
+        stats.exhausted = exhausted.reason
+    return solution
+
+
+def ida_search(start, start_h, threshold, heuristic, table=None, table_size=0, stats=None, budget=None, trace=False):
+    # One depth-first pass under `threshold` on an explicit stack, so depth is not tied
+    # to the recursion limit. expand leaves out the move straight back to the parent
+    # before the path set is consulted, children carry their h, and when `table` is given
+    # every finished node leaves the smallest f seen below it (minus its g) there as a
+    # raised lower bound for later passes. A generator like the *_events solvers: it
+    # returns the path or the next threshold.
+    goal = heuristic.target
+    if start == goal:
+        return [start]
+    if trace:
+        yield start, 0, start_h, 1
+    on_expand = stats.on_expand if stats is not None else None
+    infinity = float("inf")
+    path = [start]
+    on_path = {start}
+    frames = [iter(heuristic.expand(start, start_h))]
+    minimums = [infinity]
+    expanded = max_frontier = 1
+    generated = duplicates = 0
+    base = stats.expanded if stats is not None else 0
+    check_at = budget.next_check - base if budget is not None else -1
+    try:
+        while frames:
+            step = next(frames[-1], None)
+            if step is None:
+                frames.pop()
+                minimum = minimums.pop()
+                node = path.pop()
+                on_path.discard(node)
+                if table is not None and minimum != infinity and (node in table or len(table) < table_size):
+                    table[node] = minimum - len(path)
+                if not minimums:
+                    return minimum
+                if minimum < minimums[-1]:
+                    minimums[-1] = minimum
+                continue
+            generated += 1
+            child, child_h = step
+            if child in on_path:
+                duplicates += 1
+                continue
+            g = len(path)
+            bound = child_h
+            if table is not None:
+                bound = table.get(child, child_h)
+                if bound < child_h:
+                    bound = child_h
+            f = g + bound
+            if f > threshold:
+                if f < minimums[-1]:
+                    minimums[-1] = f
+                continue
+            if child == goal:
+                path.append(child)
+                return path
+            path.append(child)
+            on_path.add(child)
+            if expanded == check_at:
+                check_at = budget.check(base + expanded, len(path) + (len(table) if table else 0)) - base
+            expanded += 1
+            if g >= max_frontier:
+                max_frontier = g + 1
+            if on_expand is not None:
+                on_expand(child)
+            if trace:
+                yield child, g, child_h, g + 1
+            frames.append(iter(heuristic.expand(child, child_h, path[-2])))
+            minimums.append(infinity)
+    finally:
+        if stats is not None:
+            stats.add(expanded, generated, duplicates, max_frontier)
+
+
+def ida_star_events(start_state, heuristic=None, table_size=0, stats=None, budget=None, goal=None, trace=True):
+    # table_size > 0 keeps up to that many backed-up bounds across iterations
+    stats = stats or SearchStats()
+    if budget is not None:
+        budget.start()
+    board = get_board(len(start_state))
+    heuristic = get_heuristic(heuristic, board, None if goal is None else board.pack(goal))
+    start = board.pack(start_state)
+    start_h = heuristic(start)
+    table = {} if table_size else None
+    threshold = start_h
     while True:
-        temp = ida_search(path, 0, threshold)
+        if budget is not None:
+            budget.check(stats.expanded, len(table) if table else 0)
+        stats.iterations += 1
+        if stats.on_iteration is not None:
+            stats.on_iteration(stats.iterations, threshold)
+        temp = yield from ida_search(start, start_h, threshold, heuristic, table, table_size, stats, budget, trace)
         if isinstance(temp, list):
-            return temp
+            return unpack_path(temp, board)
         if temp == float("inf"):
             return None
         threshold = temp
 
 
-def solution_time(start_state, algo_type):
+def ida_star(start_state, heuristic=None, table_size=0, stats=None, budget=None, goal=None):
+    return drain(ida_star_events(start_state, heuristic, table_size, stats, budget, goal, trace=False))
+
+
+def join_paths(forward, backward, meeting, board=BOARD):  # forward leads back to the start, backward on to the goal
+    steps = []
+    code = meeting
+    while code is not None:
+        steps.append(code)
+        code = forward[code]
+    steps.reverse()
+    code = backward[meeting]
+    while code is not None:
+        steps.append(code)
+        code = backward[code]
+    return unpack_path(steps, board)
+
+
+def bidirectional_bfs_events(start_state, stats=None, budget=None, goal=None, trace=True):
+    # Whole layers are expanded from whichever side has the smaller frontier.
+    # The first child already reached by the other side closes a shortest path:
+    # a shorter one would have met while that side expanded an earlier layer.
+    # Events give g as the distance from the side's own root, and their frontier
+    # still counts the layer being expanded.
+    stats = stats or SearchStats()
+    check_at = budget.start() if budget is not None else -1
+    on_expand = stats.on_expand
+    board = get_board(len(start_state))
+    start = board.pack(start_state)
+    goal = board.goal_code if goal is None else board.pack(goal)
+    if start == goal:
+        return unpack_path([start], board)
+    forward = {start: None}
+    backward = {goal: None}
+    forward_layer = [start]
+    backward_layer = [goal]
+    forward_depth = backward_depth = 0
+    expanded = generated = max_frontier = 0
+    try:
+        while forward_layer and backward_layer:
+            if len(forward_layer) + len(backward_layer) > max_frontier:
+                max_frontier = len(forward_layer) + len(backward_layer)
+            if len(forward_layer) <= len(backward_layer):
+                layer, parents, others, depth = forward_layer, forward, backward, forward_depth
+            else:
+                layer, parents, others, depth = backward_layer, backward, forward, backward_depth
+            next_layer = []
+            for code in layer:
+                if expanded == check_at:
+                    check_at = budget.check(expanded, len(forward) + len(backward))
+                expanded += 1
+                if on_expand is not None:
+                    on_expand(code)
+                if trace:
+                    yield code, depth, None, len(forward_layer) + len(backward_layer) + len(next_layer)
+                children = board.children(code)
+                generated += len(children)
+                for child in children:
+                    if child in parents:
+                        continue
+                    parents[child] = code
+                    if child in others:
+                        return join_paths(forward, backward, child, board)
+                    next_layer.append(child)
+            if parents is forward:
+                forward_layer = next_layer
+                forward_depth += 1
+            else:
+                backward_layer = next_layer
+                backward_depth += 1
+        return None
+    finally:
+        stats.add(expanded, generated, generated - len(forward) - len(backward) + 2, max_frontier)
+
+
+def bidirectional_bfs(start_state, stats=None, budget=None, goal=None):
+    return drain(bidirectional_bfs_events(start_state, stats, budget, goal, trace=False))
+
+
+def bidirectional_A_star_events(start_state, stats=None, budget=None, goal=None, trace=True):
+    # Front-to-end bidirectional A*: the forward side aims at the goal, the backward
+    # side at the start, each with a consistent Manhattan heuristic. The best meeting
+    # is optimal once it is no longer than the larger of the two open f minima. Both
+    # sides build their move tables against their target, so `goal` may be any layout.
+    stats = stats or SearchStats()
+    check_at = budget.start() if budget is not None else -1
+    on_expand = stats.on_expand
+    board = get_board(len(start_state))
+    start = board.pack(start_state)
+    goal = board.goal_code if goal is None else board.pack(goal)
+    if start == goal:
+        return unpack_path([start], board)
+    moves = (board.moves if goal == board.goal_code else build_move_tables(board, goal)[2], build_move_tables(board, start)[2])
+    costs = ({start: 0}, {goal: 0})
+    parents = ({start: None}, {goal: None})
+    start_h = board.manhattan(start, goal)
+    opens = ([(start_h, 0, start_h, start)], [(start_h, 0, start_h, goal)])
+    best = float("inf")
+    meeting = None
+    expanded = generated = duplicates = max_frontier = 0
+    try:
+        while opens[0] and opens[1]:
+            if best <= max(opens[0][0][0], opens[1][0][0]):
+                break
+            if len(opens[0]) + len(opens[1]) > max_frontier:
+                max_frontier = len(opens[0]) + len(opens[1])
+            side = 0 if len(opens[0]) <= len(opens[1]) else 1
+            _, g, h, current = heappop(opens[side])
+            g = -g  # stored negated so ties favour the deeper node
+            cost, other = costs[side], costs[1 - side]
+            if g > cost[current]:
+                duplicates += 1
+                continue
+            if expanded == check_at:
+                check_at = budget.check(expanded, len(costs[0]) + len(costs[1]) + len(opens[0]) + len(opens[1]))
+            expanded += 1
+            if on_expand is not None:
+                on_expand(current)
+            if trace:
+                yield current, g, h, len(opens[0]) + len(opens[1])
+            children = board.expand(current, h, None, moves[side])
+            generated += len(children)
+            for child, child_h in children:
+                new_cost = g + 1
+                if new_cost < cost.get(child, new_cost + 1):
+                    cost[child] = new_cost
+                    parents[side][child] = current
+                    heappush(opens[side], (new_cost + child_h, -new_cost, child_h, child))
+                    if child in other and new_cost + other[child] < best:
+                        best = new_cost + other[child]
+                        meeting = child
+                else:
+                    duplicates += 1
+    finally:
+        stats.add(expanded, generated, duplicates, max_frontier)
+    if meeting is None:
+        return None
+    return join_paths(parents[0], parents[1], meeting, board)
+
+
+def bidirectional_A_star(start_state, stats=None, budget=None, goal=None):
+    return drain(bidirectional_A_star_events(start_state, stats, budget, goal, trace=False))
+
+
+LOOKUP_FILE = os.path.join(DATA_DIR, "lookup.bin")
+
+
+def build_lookup_table(filename=LOOKUP_FILE):
+    # One retrograde BFS from the goal. Each byte holds (distance << 2) | slot,
+    # where slot picks the entry of MOVES[blank] that leads one step closer.
+    engine = layer_engine()
+    if engine is not None:
+        table = bytearray(engine.distance_table())
+    else:
+        table = bytearray([UNSEEN]) * STATE_COUNT
+        table[rank(GOAL_CODE)] = 0
+        layer = [GOAL_CODE]
+        depth = 0
+        while layer:
+            depth += 1
+            next_layer = []
+            for code in layer:
+                blank = code >> BLANK_SHIFT
+                for child in BOARD.children(code):
+                    number = rank(child)
+                    if table[number] == UNSEEN:
+                        slot = NEIGHBOURS[child >> BLANK_SHIFT].index(blank)
+                        table[number] = (depth << 2) | slot
+                        next_layer.append(child)
+            layer = next_layer
+    write_file(filename, table)
+    return table
+
+
+def write_file(filename, data):
+    # Written beside `filename` and then renamed over it, so a reader (another process,
+    # or the next run after this one was killed) sees the old file or the whole new one.
+    handle, temporary = tempfile.mkstemp(prefix=os.path.basename(filename) + ".", suffix=".tmp", dir=os.path.dirname(os.path.abspath(filename)))
+    try:
+        with os.fdopen(handle, "wb") as file:
+            file.write(data)
+        os.replace(temporary, filename)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def mapped_rss(filename):  # resident bytes of this process's mappings of `filename`, None without /proc
+    path = os.path.realpath(filename)
+    try:
+        with open("/proc/self/smaps") as smaps:
+            lines = smaps.readlines()
+    except OSError:
+        return None
+    total = 0
+    inside = False
+    for line in lines:
+        fields = line.split(None, 5)
+        if not fields[0].endswith(":"):  # the header line of a mapping
+            inside = len(fields) == 6 and fields[5].rstrip("\n") == path
+        elif inside and fields[0] == "Rss:":
+            total += int(fields[1]) * 1024
+    return total
+
+
+class LookupTable:
+    def __init__(self, filename=LOOKUP_FILE, preload=False):
+        started = time.perf_counter()
+        if not os.path.exists(filename):
+            build_lookup_table(filename)
+        with open(filename, "rb") as file:
+            if preload:
+                self.table = file.read()
+            else:
+                self.table = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.filename = filename
+        self.preloaded = preload
+        self.load_time = time.perf_counter() - started
+        self.nbytes = len(self.table)
+        self.by_depth = {}
+
+    def memory_report(self):
+        # a mapped table only becomes resident page by page as solves touch it; that part
+        # is read from /proc/self/smaps (None where there is no /proc)
+        return {
+            "load_time": self.load_time,
+            "mapped_bytes": 0 if self.preloaded else self.nbytes,
+            "resident_bytes": self.nbytes if self.preloaded else mapped_rss(self.filename),
+        }
+
+    def distance(self, code):
+        number = rank(code)
+        if number is None:
+            return None
+        return self.table[number] >> 2
+
+    def ranks_at(self, depth):
+        if depth not in self.by_depth:
+            self.by_depth[depth] = [number for number, entry in enumerate(bytes(self.table)) if entry >> 2 == depth and entry != UNSEEN]
+        return self.by_depth[depth]
+
+    def solve(self, code):
+        number = rank(code)
+        if number is None:
+            return None
+        entry = self.table[number]
+        codes = [code]
+        for _ in range(entry >> 2):
+            shift, mult, flip, _ = MOVES[code >> BLANK_SHIFT][entry & 3]
+            code = code ^ ((code >> shift) & CELL_MASK) * mult ^ flip
+            codes.append(code)
+            entry = self.table[rank(code)]
+        return codes
+
+
+lookup_table = None
+
+
+def get_lookup_table():
+    global lookup_table
+    if lookup_table is None:
+        lookup_table = LookupTable()
+    return lookup_table
+
+
+class LookupBound(Heuristic):
+    # |distance to the goal - distance from `target` to the goal|, both read from the
+    # lookup table: a consistent lower bound on the distance to `target` by the triangle
+    # inequality, and a tight one for a target a few moves from the goal.
+    def __init__(self, target):
+        super().__init__(BOARD, target)
+        self.table = get_lookup_table()
+        self.offset = self.table.distance(target)
+
+    def __call__(self, code):
+        return abs(self.table.distance(code) - self.offset)
+
+
+def lookup(start_state, stats=None, budget=None, goal=None):
+    # Table reads only, so stats and budget go unused. Towards another `goal` the
+    # table's distances bound an A* search instead.
+    if len(start_state) != 3:
+        raise ValueError("the lookup table only covers the 3x3 puzzle")
+    if goal is not None and pack(goal) != GOAL_CODE:
+        return A_star(start_state, LookupBound(pack(goal)), stats, budget, goal=goal)
+    codes = get_lookup_table().solve(pack(start_state))
+    if codes is None:
+        return None
+    return unpack_path(codes)
+
+
+def random_state(depth=None, rng=random, size=3):
+    # uniform over the solvable boards, or over those exactly `depth` moves from the goal
+    if size != 3:
+        if depth is not None:
+            raise ValueError("boards of a given depth need the 3x3 lookup table")
+        tiles = list(range(size * size))
+        rng.shuffle(tiles)
+        state = [tiles[i * size : (i + 1) * size] for i in range(size)]
+        if not is_solvable(state):  # swapping two tiles flips the inversion parity
+            cells = [(i, j) for i in range(size) for j in range(size) if state[i][j] != 0]
+            (a, b), (c, d) = cells[0], cells[1]
+            state[a][b], state[c][d] = state[c][d], state[a][b]
+        return state
+    if depth is None:
+        return unpack(unrank(rng.randrange(STATE_COUNT)))
+    ranks = get_lookup_table().ranks_at(depth)
+    if not ranks:
+        raise ValueError(f"no board is {depth} moves from the goal")
+    return unpack(unrank(rng.choice(ranks)))
+
+
+def generate_instances(count, depth=None, seed=None, size=3):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield random_state(depth, rng, size)
+
+
+# Every algo_type solution_time takes, those that always return a shortest path, and
+# those that take a heuristic.
+ALGORITHMS = [
+    "bfs",
+    "dfs",
+    "ucs",
+    "iddfs",
+    "gbfs",
+    "A_star",
+    "ida_star",
+    "hill_simp",
+    "hill_steepest",
+    "hill_stochastic",
+    "hill_restarts",
+    "simulated_annealing",
+    "beam_search",
+    "tabu_search",
+    "bidirectional_bfs",
+    "bidirectional_A_star",
+    "ara_star",
+    "lookup",
+    "portfolio",
+    "portfolio_optimal",
+]
+OPTIMAL = {"bfs", "ucs", "A_star", "ida_star", "bidirectional_bfs", "bidirectional_A_star", "lookup"}
+INFORMED = {"gbfs", "A_star", "ida_star", "ara_star", "hill_simp", "hill_steepest", "hill_stochastic"} | set(LOCAL_SEARCHES)
+
+
+def solution_time(start_state, algo_type, heuristic=None, stats=None, budget=None, cache=None, goal=None, compact=False):
+    # Returns (solution, execution_time, stats); pass a SearchStats to set hooks and a
+    # Budget to bound the solve. An exhausted budget gives a None solution and says
+    # which limit ran out in stats.exhausted. With a Cache.SolutionCache, hits skip
+    # the search and leave stats untouched. Any other `goal` layout is solved through
+    # its GoalMap. When the goal's blank is off the corners, the optimal solvers search
+    # towards the goal's own image there, as the GoalMap's detour through a corner would
+    # cost them their optimality; their heuristics are then measured against it.
+    # `compact` goes on to the solvers that take it (bfs, dfs, ucs, gbfs and A_star).
+    if goal is not None and goal != goal_state(len(goal)):
+        goal_map = get_goal_map(goal)
+        if len(goal_map.slide) > 1 and (algo_type in OPTIMAL or algo_type == "portfolio_optimal"):
+            solution, execution_time, stats = timed_solve(goal_map.to_standard(start_state), algo_type, heuristic, stats, budget, cache, compact, goal_map.to_standard(goal))
+            if solution is not None:
+                solution = [goal_map.from_standard(step) for step in solution]
+            return solution, execution_time, stats
+        solution, execution_time, stats = timed_solve(goal_map.to_standard(start_state), algo_type, heuristic, stats, budget, cache, compact)
+        if solution is not None:
+            solution = goal_map.path_back(solution)
+        return solution, execution_time, stats
+    return timed_solve(start_state, algo_type, heuristic, stats, budget, cache, compact)
+
+
+def timed_solve(start_state, algo_type, heuristic, stats, budget, cache, compact, goal=None):
+    # solution_time on the standard side of a GoalMap; `goal` is only given to the
+    # optimal solvers, whose goal's blank the map could not take to a corner.
+    stats = stats or SearchStats()
     start_time = time.time()
-    if algo_type == "dfs":
-        solution = dfs(start_state)
-        end_time = time.time()
-    elif algo_type == "bfs":
-        solution = bfs(start_state)
-        end_time = time.time()
-    elif algo_type == "ucs":
-        solution = ucs(start_state)
-        end_time = time.time()
-    elif algo_type == "iddfs":
-        solution = iddfs(start_state)
-        end_time = time.time()
-    elif algo_type == "gbfs":
-        solution = gbfs(start_state)
-        end_time = time.time()
-    elif algo_type == "A_star":
-        solution = A_star(start_state)
-        end_time = time.time()
-    elif algo_type == "ida_star":
-        solution = ida_star(start_state)
-        end_time = time.time()
-    elif algo_type == "hill_simp":
-        solution = hill_simp(start_state)
-        end_time = time.time()
-    elif algo_type == "hill_steepest":
-        solution = hill_climbing_steepest(start_state)
-        end_time = time.time()
-    elif algo_type == "hill_stochastic":
-        solution = hill_climbing_stochastic(start_state)
+    if cache is not None:
+        solution = cache.get(start_state, algo_type, heuristic, goal)
+        if solution is not None:
+            return solution, time.time() - start_time, stats
+    try:
+        if not is_solvable(start_state):
+            solution = None
+            end_time = time.time()
+        elif algo_type == "dfs":
+            solution = dfs(start_state, stats=stats, budget=budget, compact=compact)
+            end_time = time.time()
+        elif algo_type == "bfs":
+            solution = bfs(start_state, stats, budget, compact, goal)
+            end_time = time.time()
+        elif algo_type == "ucs":
+            solution = ucs(start_state, stats, budget, compact, goal)
+            end_time = time.time()
+        elif algo_type == "iddfs":
+            solution = iddfs(start_state, stats=stats, budget=budget)
+            end_time = time.time()
+        elif algo_type == "gbfs":
+            solution = gbfs(start_state, heuristic, stats, budget, compact)
+            end_time = time.time()
+        elif algo_type == "A_star":
+            solution = A_star(start_state, heuristic, stats, budget, compact, goal)
+            end_time = time.time()
+        elif algo_type == "ida_star":
+            solution = ida_star(start_state, heuristic, stats=stats, budget=budget, goal=goal)
+            end_time = time.time()
+        elif algo_type == "hill_simp":
+            solution = hill_simp(start_state, heuristic, stats, budget)
+            end_time = time.time()
+        elif algo_type == "hill_steepest":
+            solution = hill_climbing_steepest(start_state, heuristic, stats, budget)
+            end_time = time.time()
+        elif algo_type == "hill_stochastic":
+            solution = hill_climbing_stochastic(start_state, heuristic, stats, budget)
+            end_time = time.time()
+        elif algo_type == "hill_restarts":
+            solution = hill_restarts(start_state, heuristic, stats=stats, budget=budget)
+            end_time = time.time()
+        elif algo_type == "simulated_annealing":
+            solution = simulated_annealing(start_state, heuristic, stats=stats, budget=budget)
+            end_time = time.time()
+        elif algo_type == "beam_search":
+            solution = beam_search(start_state, heuristic, stats=stats, budget=budget)
+            end_time = time.time()
+        elif algo_type == "tabu_search":
+            solution = tabu_search(start_state, heuristic, stats=stats, budget=budget)
+            end_time = time.time()
+        elif algo_type == "bidirectional_bfs":
+            solution = bidirectional_bfs(start_state, stats, budget, goal)
+            end_time = time.time()
+        elif algo_type == "bidirectional_A_star":
+            solution = bidirectional_A_star(start_state, stats, budget, goal)
+            end_time = time.time()
+        elif algo_type == "ara_star":
+            solution = ara_star(start_state, heuristic, stats=stats, budget=budget)
+            end_time = time.time()
+        elif algo_type == "lookup":
+            solution = lookup(start_state, stats, budget, goal)
+            end_time = time.time()
+        elif algo_type in ("portfolio", "portfolio_optimal"):
+            from Parallel import portfolio  # Parallel imports this module
+
+            solution = portfolio(start_state, heuristic, optimal=algo_type == "portfolio_optimal", stats=stats, budget=budget, goal=goal)
+            end_time = time.time()
+    except BudgetExhausted as exhausted:
+        solution = None
+        stats.exhausted = exhausted.reason
         end_time = time.time()
     execution_time = end_time - start_time
-    return solution, execution_time
+    if cache is not None and solution is not None and stats.exhausted is None:  # not an ARA* path cut short
+        cache.put(start_state, algo_type, heuristic, solution, goal)
+    return solution, execution_time, stats
+
+
+def unpack_path(codes, board=BOARD):
+    return [board.unpack(code) for code in codes]
 
 
-def re_path(path, state):
+def re_path(path, code, board=BOARD):
     steps = []
-    while state is not None:
-        steps.append(state)
-        state = path[hst(state)]
-    return steps[::-1]
+    while code is not None:
+        steps.append(code)
+        code = path[code]
+    return unpack_path(steps[::-1], board)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,220 @@
+import os
+import time
+from multiprocessing import Event, Pipe, Pool, Process, Value
+from multiprocessing.connection import wait
+
+from Logic import DEFAULT_EVALUATIONS, INFORMED, LOCAL_SEARCHES, OPTIMAL, Budget, BudgetExhausted, SearchStats, get_board, get_heuristic, get_lookup_table, solution_time
+
+PORTFOLIO = ["gbfs", "A_star", "ida_star", "bidirectional_A_star"]
+
+worker_algo = None
+worker_heuristic = None
+worker_budget = None
+worker_compact = False
+worker_restart = None
+
+
+def load_tables(algo_type, heuristic, sizes):
+    # Builds any missing table file and loads (or maps) the tables. solve_many calls
+    # this before starting its workers, so they never build the files themselves, all
+    # at once over each other.
+    if algo_type in INFORMED:
+        for size in sizes:
+            get_heuristic(heuristic, get_board(size))
+    if algo_type == "lookup":
+        get_lookup_table()
+
+
+def init_worker(algo_type, heuristic, sizes, budget=None, compact=False):
+    # Runs once in every worker: read-only tables are loaded (or mapped) here so the
+    # solves themselves never pay for them. Forked workers inherit them from the parent.
+    global worker_algo, worker_heuristic, worker_budget, worker_compact
+    worker_algo = algo_type
+    worker_heuristic = heuristic
+    worker_budget = budget
+    worker_compact = compact
+    load_tables(algo_type, heuristic, sizes)
+
+
+def solve_one(job):
+    # A board that makes the solver raise comes back unsolved with stats.exhausted set
+    # to "error: " and the exception, so the other boards carry on.
+    index, state, goal = job
+    try:
+        return (index,) + solution_time(state, worker_algo, worker_heuristic, budget=worker_budget, goal=goal, compact=worker_compact)
+    except Exception as error:
+        stats = SearchStats()
+        stats.exhausted = f"error: {type(error).__name__}: {error}"
+        return index, None, 0.0, stats
+
+
+def solve_many(states, algo_type="ida_star", workers=None, heuristic=None, chunksize=None, budget=None, goals=None, compact=False):
+    # Yields (index, solution, execution_time, stats) in the order the boards finish.
+    # `budget` applies to every board on its own; its token must be a multiprocessing Event.
+    # `goals`, if given, holds a goal layout (or None) for every board. `compact` is
+    # passed on to solution_time.
+    states = list(states)
+    goals = goals or [None] * len(states)
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, len(states) // (workers * 4))
+    sizes = {len(state) for state in states}
+    load_tables(algo_type, heuristic, sizes)
+    with Pool(workers, initializer=init_worker, initargs=(algo_type, heuristic, sizes, budget, compact)) as pool:
+        yield from pool.imap_unordered(solve_one, zip(range(len(states)), states, goals), chunksize)
+
+
+def init_restarts(state, algo_type, heuristic, evaluations, found):
+    global worker_restart
+    worker_restart = state, LOCAL_SEARCHES[algo_type], heuristic, evaluations, found
+    get_heuristic(heuristic, get_board(len(state)))
+
+
+def restart_one(seed):
+    state, solver, heuristic, evaluations, found = worker_restart
+    stats = SearchStats()
+    try:
+        solution = solver(state, heuristic, evaluations=evaluations, seed=seed, stats=stats, budget=Budget(token=found))
+    except BudgetExhausted as exhausted:  # another run got there first
+        solution = None
+        stats.exhausted = exhausted.reason
+    if solution is not None:
+        found.set()
+    return solution, stats
+
+
+def parallel_restarts(state, algo_type="hill_restarts", workers=None, heuristic=None, evaluations=DEFAULT_EVALUATIONS, runs=None, seed=0):
+    # Independent runs of a LOCAL_SEARCHES solver, seeded seed, seed + 1, ..., `runs`
+    # of them (one per worker by default). The first success stops the others and is
+    # returned as (solution, execution_time, stats), stats summed over the runs.
+    workers = workers or os.cpu_count() or 1
+    runs = runs or workers
+    found = Event()
+    total = SearchStats()
+    load_tables(algo_type, heuristic, {len(state)})
+    solution = None
+    started = time.perf_counter()
+    with Pool(workers, initializer=init_restarts, initargs=(state, algo_type, heuristic, evaluations, found)) as pool:
+        for solution, stats in pool.imap_unordered(restart_one, range(seed, seed + runs)):
+            total.add(stats.expanded, stats.generated, stats.duplicates, stats.max_frontier)
+            total.iterations += stats.iterations
+            total.plateaus += stats.plateaus
+            if solution is not None:
+                break
+    return solution, time.perf_counter() - started, total
+
+
+def run_entrant(state, algo_type, heuristic, budget, goal, sender):
+    sender.send(solution_time(state, algo_type, heuristic, budget=budget, goal=goal))
+    sender.close()
+
+
+def portfolio(start_state, heuristic=None, algorithms=None, optimal=False, stats=None, budget=None, goal=None):
+    # Races `algorithms` (PORTFOLIO by default), each in a process of its own, and returns
+    # the first path found; the other entrants are killed then and there. With
+    # optimal=True only the solvers in OPTIMAL take part. stats become the winner's, with
+    # its name in stats.winner. Entrants are child processes, so this cannot run inside
+    # solve_many's pool workers. `goal` is passed on to solution_time.
+    stats = stats or SearchStats()
+    algorithms = [algo_type for algo_type in algorithms or PORTFOLIO if not optimal or algo_type in OPTIMAL]
+    if not algorithms:
+        raise ValueError("no optimal solver in the portfolio")
+    for algo_type in algorithms:
+        load_tables(algo_type, heuristic, {len(start_state)})
+    entrants = {}
+    for algo_type in algorithms:
+        receiver, sender = Pipe(duplex=False)
+        process = Process(target=run_entrant, args=(start_state, algo_type, heuristic, budget, goal, sender), daemon=True)
+        process.start()
+        sender.close()
+        entrants[receiver] = algo_type, process
+    solution = None
+    try:
+        while entrants and solution is None:
+            for receiver in wait(list(entrants)):
+                algo_type, process = entrants.pop(receiver)
+                try:
+                    solution, _, result = receiver.recv()
+                except EOFError:  # the entrant died without an answer
+                    continue
+                finally:
+                    receiver.close()
+                    process.join()
+                for name in SearchStats.fields:
+                    setattr(stats, name, getattr(result, name))
+                if solution is not None:
+                    stats.winner = algo_type
+                    break
+    finally:
+        for receiver, (algo_type, process) in entrants.items():
+            process.kill()
+            process.join()
+            receiver.close()
+    return solution
+
+
+class ProgressBudget(Budget):
+    # An unlimited budget whose periodic checks publish the expansion count.
+    def __init__(self, nodes):
+        super().__init__()
+        self.progress = nodes
+
+    def check(self, expanded, stored):
+        self.progress.value = expanded
+        return super().check(expanded, stored)
+
+
+def run_in_background(state, algo_type, heuristic, sender, nodes, bound):
+    on_solution = lambda path, path_bound: sender.send(("best", path, path_bound))
+    stats = SearchStats(on_iteration=lambda number, value: setattr(bound, "value", value), on_solution=on_solution)
+    sender.send(solution_time(state, algo_type, heuristic, stats, ProgressBudget(nodes)))
+    sender.close()
+
+
+class BackgroundSolve:
+    # One solve in its own process, so a caller such as the pygame loop never blocks.
+    # nodes and bound (the IDDFS depth, IDA* threshold or ARA* weight, -1 for other
+    # solvers) are shared values the worker updates while it runs; poll() returns the
+    # (solution, execution_time, stats) of solution_time once it is done, and until
+    # then keeps the latest ARA* (path, bound) in best.
+    def __init__(self, state, algo_type, heuristic=None):
+        self.algo_type = algo_type
+        self.nodes = Value("q", 0, lock=False)
+        self.bound = Value("d", -1, lock=False)
+        self.receiver, sender = Pipe(duplex=False)
+        self.process = Process(target=run_in_background, args=(state, algo_type, heuristic, sender, self.nodes, self.bound), daemon=True)
+        self.started = time.perf_counter()
+        self.process.start()
+        sender.close()
+        self.result = None
+        self.best = None
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def poll(self):
+        while self.result is None and self.receiver.poll():
+            try:
+                message = self.receiver.recv()
+            except EOFError:  # the worker died without an answer
+                stats = SearchStats()
+                stats.exhausted = "error"
+                message = None, self.elapsed(), stats
+            if message[0] == "best":
+                self.best = message[1:]
+                continue
+            self.result = message
+            self.process.join()
+        return self.result
+
+    def cancel(self):  # kill, not terminate: a child forked from pygame keeps SDL's SIGTERM handler
+        self.process.kill()
+        self.process.join()
+        self.receiver.close()
+
+
+if __name__ == "__main__":
+    from Logic import generate_instances
+
+    for index, solution, execution_time, stats in solve_many(generate_instances(100, seed=0), "A_star"):
+        print(index, len(solution) - 1, f"{execution_time:.4f}s", stats.expanded)
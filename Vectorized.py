@@ -0,0 +1,130 @@
+try:
+    import numpy as np
+except ImportError:  # optional: without it Logic keeps to its pure Python bfs and table build
+    np = None
+
+from Logic import BLANK_SHIFT, CELL_BITS, CELL_MASK, GOAL_CODE, HALF_PERMUTATIONS, MOVES, NEIGHBOURS, STATE_COUNT, UNSEEN, SearchStats, get_rank_tables, pack, unpack_path
+
+# Breadth-first search over the 3x3 board a whole layer at a time. A layer is a uint64
+# array of packed codes; its children come from one masked xor per (state, move) pair,
+# the same arithmetic as Board.children, and are deduplicated through their ranks
+# against a visited array covering the whole state space. Layers keep the order a FIFO
+# queue would hold them in: children follow their parents' order and then MOVES order,
+# and a state reached twice keeps its first parent.
+
+tables = None
+
+
+def get_tables():
+    global tables
+    if tables is None:
+        head, tail, low, high = get_rank_tables()
+        # [blank, move] grids of each move's shift, mult, flip and slot back to the parent,
+        # padded to four moves; `valid` marks the real ones
+        shifts, mults, flips = (np.zeros((9, 4), dtype=np.uint64) for _ in range(3))
+        slots = np.zeros((9, 4), dtype=np.uint8)
+        valid = np.zeros((9, 4), dtype=bool)
+        for blank in range(9):
+            for number, ((shift, mult, flip, _), neighbour) in enumerate(zip(MOVES[blank], NEIGHBOURS[blank])):
+                shifts[blank, number], mults[blank, number], flips[blank, number] = shift, mult, flip
+                slots[blank, number] = NEIGHBOURS[neighbour].index(blank)
+                valid[blank, number] = True
+        tables = (
+            np.frombuffer(head, dtype=np.uint16).astype(np.int64),
+            np.frombuffer(tail, dtype=np.uint16).astype(np.int64),
+            np.array(low, dtype=np.uint64),
+            np.array(high, dtype=np.uint64),
+            (shifts, mults, flips, slots, valid),
+        )
+    return tables
+
+
+def ranks(codes):  # Logic.rank for an array of reachable codes
+    head, tail, low, high, _ = get_tables()
+    blanks = codes >> BLANK_SHIFT
+    tiles = (codes & low[blanks]) | ((codes >> CELL_BITS) & high[blanks])
+    return blanks.astype(np.int64) * HALF_PERMUTATIONS + ((head[tiles & 0xFFFF] + tail[tiles >> 16]) >> 1)
+
+
+def expand(layer):  # (children, slots): every child of the layer in queue order and the MOVES slot leading back from it
+    shifts, mults, flips, slots, valid = get_tables()[4]
+    blanks = (layer >> BLANK_SHIFT).astype(np.intp)
+    parents = layer[:, None]
+    children = parents ^ ((parents >> shifts[blanks]) & CELL_MASK) * mults[blanks] ^ flips[blanks]
+    real = valid[blanks]
+    return children[real], slots[blanks][real]
+
+
+def fresh(children, seen):  # indices of the children not yet seen, the first of each state in order, and their ranks
+    numbers = ranks(children)
+    unseen = np.flatnonzero(~seen[numbers])
+    numbers, first = np.unique(numbers[unseen], return_index=True)
+    order = np.argsort(first)
+    return unseen[first[order]], numbers[order]
+
+
+def bfs(start_state, stats=None, budget=None):
+    # The path of Logic.bfs_events. The goal is found when its layer comes up, so
+    # `expanded` counts whole layers, and a node budget stops the search before the
+    # layer that would overrun it.
+    stats = stats or SearchStats()
+    if budget is not None:
+        budget.start()
+    start = np.array([pack(start_state)], dtype=np.uint64)
+    goal = np.uint64(GOAL_CODE)
+    seen = np.zeros(STATE_COUNT, dtype=bool)
+    seen[ranks(start)] = True
+    layers = [start]
+    expanded = generated = max_frontier = 0
+    stored = 1
+    try:
+        while layers[-1].size:
+            layer = layers[-1]
+            if layer.size > max_frontier:
+                max_frontier = layer.size
+            if (layer == goal).any():
+                return walk_back(layers, goal)
+            if budget is not None:
+                if budget.nodes is not None and expanded + layer.size > budget.nodes:
+                    budget.check(budget.nodes, stored)
+                budget.check(expanded, stored)
+            children, _ = expand(layer)
+            expanded += layer.size
+            generated += children.size
+            keep, numbers = fresh(children, seen)
+            seen[numbers] = True
+            stored += keep.size
+            layers.append(children[keep])
+        return None
+    finally:
+        stats.add(int(expanded), int(generated), int(generated - stored + 1), int(max_frontier))
+
+
+def walk_back(layers, code):  # the path to `code` in the last layer, through the first parent in every earlier layer
+    steps = [int(code)]
+    for layer in reversed(layers[:-1]):
+        current = steps[-1]
+        parents = np.array([current ^ ((current >> shift) & CELL_MASK) * mult ^ flip for shift, mult, flip, _ in MOVES[current >> BLANK_SHIFT]], dtype=np.uint64)
+        steps.append(int(layer[np.isin(layer, parents)][0]))
+    steps.reverse()
+    return unpack_path(steps)
+
+
+def distance_table(start_code=GOAL_CODE):
+    # The lookup table's bytes, (distance << 2) | slot for every rank, built backwards
+    # from `start_code` (the goal).
+    table = np.full(STATE_COUNT, UNSEEN, dtype=np.uint8)
+    seen = np.zeros(STATE_COUNT, dtype=bool)
+    layer = np.array([start_code], dtype=np.uint64)
+    first = ranks(layer)
+    seen[first] = True
+    table[first] = 0
+    depth = 0
+    while layer.size:
+        depth += 1
+        children, slots = expand(layer)
+        keep, numbers = fresh(children, seen)
+        seen[numbers] = True
+        table[numbers] = (depth << 2) | slots[keep]
+        layer = children[keep]
+    return table.tobytes()
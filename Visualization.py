@@ -1,9 +1,9 @@
-import random
 import time
 
 import pygame
 
-from Logic import solution_time
+from Logic import SearchStats, goal_state as make_goal, hst, random_state
+from Parallel import BackgroundSolve
 
 WINDOW_WIDTH = 500
 WINDOW_HEIGHT = 600
@@ -16,13 +16,6 @@ GRAY = (200, 200, 200)
 DARKGRAY = (100, 100, 100)
 RED = (255, 0, 0)
 
-pygame.init()
-screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-pygame.display.set_caption("8-Puzzle Solver")
-clock = pygame.time.Clock()
-font_large = pygame.font.Font(None, 36)
-font_small = pygame.font.Font(None, 24)
-
 TILE_SIZE = 60
 PUZZLE_WIDTH = TILE_SIZE * 3
 PUZZLE_HEIGHT = TILE_SIZE * 3
@@ -33,20 +26,69 @@ RIGHT_PUZZLE_OFFSET = (270, 20)
 RIGHT_TEXT = (320, 200)
 CENTER_PUZZLE_OFFSET = (140, 20)
 
+STEP_EVENT = pygame.USEREVENT + 1
+FRAME_MS = 16  # playback never wakes more often than this
+
+# Frames are drawn through refresh(): an area is repainted only when what it shows has
+# changed since it was last painted, and only the repainted areas reach the display.
+tile_sprites = {}
+drawn = {}  # area -> key of what it shows
+dirty = []
+
+
+def tile_sprite(value, tile_size, font, border):  # one pre-rendered surface per tile value and size
+    key = (value, tile_size, font, border)
+    if key not in tile_sprites:
+        sprite = pygame.Surface((tile_size, tile_size))
+        sprite.fill(BLUE if value != 0 else WHITE)
+        if value != 0:
+            text = font.render(str(value), True, WHITE)
+            sprite.blit(text, text.get_rect(center=(tile_size // 2, tile_size // 2)))
+        pygame.draw.rect(sprite, BLACK, sprite.get_rect(), border)
+        tile_sprites[key] = sprite
+    return tile_sprites[key]
+
+
+def refresh(area, key, draw, *args):
+    if drawn.get(area) != key:
+        drawn[area] = key
+        draw(*args)
+        dirty.append(area)
+
+
+def invalidate():  # the next frame repaints everything
+    drawn.clear()
+    screen.fill(WHITE)
+    dirty.append(screen.get_rect())
+
+
+def present():
+    if dirty:
+        pygame.display.update(dirty)
+        dirty.clear()
+
+
+def draw_text(surface, text, area, color=BLACK):
+    pygame.draw.rect(surface, WHITE, area)
+    surface.blit(font_small.render(text, True, color), area[:2])
+
+
+def refresh_text(text, area):
+    refresh(area, text, draw_text, screen, text, area)
+
 
 def draw_puzzle(surface, state, offset=(0, 0)):
+    size = len(state)
+    tile_size = PUZZLE_WIDTH // size
     x_offset, y_offset = offset
     pygame.draw.rect(surface, WHITE, (x_offset, y_offset, PUZZLE_WIDTH, PUZZLE_HEIGHT))
-    for i in range(3):
-        for j in range(3):
-            value = state[i][j]
-            rect = pygame.Rect(x_offset + j * TILE_SIZE, y_offset + i * TILE_SIZE, TILE_SIZE, TILE_SIZE)
-            if value != 0:
-                pygame.draw.rect(surface, BLUE, rect)
-                text = font_large.render(str(value), True, WHITE)
-                text_rect = text.get_rect(center=rect.center)
-                surface.blit(text, text_rect)
-            pygame.draw.rect(surface, BLACK, rect, 2)
+    for i in range(size):
+        for j in range(size):
+            surface.blit(tile_sprite(state[i][j], tile_size, font_large, 2), (x_offset + j * tile_size, y_offset + i * tile_size))
+
+
+def refresh_puzzle(state, offset):
+    refresh((offset[0], offset[1], PUZZLE_WIDTH, PUZZLE_HEIGHT), hst(state), draw_puzzle, screen, state, offset)
 
 
 class Button:
@@ -55,16 +97,22 @@ class Button:
         self.text = text
         self.color = DARKGRAY
         self.hover_color = GRAY
+        self.label = None  # (text, rendered text)
 
     def draw(self, surface):
         mouse_pos = pygame.mouse.get_pos()
         current_color = self.hover_color if self.rect.collidepoint(mouse_pos) else self.color
         pygame.draw.rect(surface, current_color, self.rect)
         pygame.draw.rect(surface, BLACK, self.rect, 2)
-        txt_surface = font_small.render(self.text, True, BLACK)
+        if self.label is None or self.label[0] != self.text:
+            self.label = self.text, font_small.render(self.text, True, BLACK)
+        txt_surface = self.label[1]
         txt_rect = txt_surface.get_rect(center=self.rect.center)
         surface.blit(txt_surface, txt_rect)
 
+    def refresh(self):
+        refresh(tuple(self.rect), (self.text, self.rect.collidepoint(pygame.mouse.get_pos())), self.draw, screen)
+
     def is_clicked(self, event):
         if event.type == pygame.MOUSEBUTTONDOWN:
             if self.rect.collidepoint(event.pos):
@@ -96,6 +144,14 @@ class Slider:
         knob_center = (self.knob_x, self.rect.centery)
         pygame.draw.circle(surface, RED, knob_center, self.knob_radius)
 
+    def repaint(self, surface, area):
+        pygame.draw.rect(surface, WHITE, area)
+        self.draw(surface)
+
+    def refresh(self):
+        area = tuple(self.rect.inflate(self.knob_radius * 2, 0))
+        refresh(area, self.value, self.repaint, screen, area)
+
     def handle_event(self, event):
         if event.type == pygame.MOUSEBUTTONDOWN:
             if pygame.Rect(self.knob_x - self.knob_radius, self.rect.centery - self.knob_radius, self.knob_radius * 2, self.knob_radius * 2).collidepoint(event.pos):
@@ -109,64 +165,72 @@ class Slider:
 
 
 def draw_thumbnail(surface, state, offset, thumb_size):
-    thumb_width = thumb_size * 3
-    thumb_height = thumb_size * 3
+    size = len(state)
     x_offset, y_offset = offset
-    pygame.draw.rect(surface, WHITE, (x_offset, y_offset, thumb_width, thumb_height))
-    for i in range(3):
-        for j in range(3):
-            value = state[i][j]
-            rect = pygame.Rect(x_offset + j * thumb_size, y_offset + i * thumb_size, thumb_size, thumb_size)
-            if value != 0:
-                pygame.draw.rect(surface, BLUE, rect)
-                text = font_small.render(str(value), True, WHITE)
-                text_rect = text.get_rect(center=rect.center)
-                surface.blit(text, text_rect)
-            pygame.draw.rect(surface, BLACK, rect, 1)
-
-
-def animate_solution(solution, slider, time_solved):
-    running = True
-    i = 0
+    for i in range(size):
+        for j in range(size):
+            surface.blit(tile_sprite(state[i][j], thumb_size, font_small, 1), (x_offset + j * thumb_size, y_offset + i * thumb_size))
+
+
+class Playback:
+    # Which step of a solution is on screen. A timer posts STEP_EVENT every `delay`
+    # seconds, or every frame when that is shorter, and advance() works the step out
+    # from the clock, so short delays skip boards instead of falling behind.
+    def __init__(self, count, delay):
+        self.count = count
+        self.delay = delay
+        self.seek(0)
+
+    def seek(self, step):
+        self.step = min(max(step, 0), self.count - 1)
+        self.anchor = time.perf_counter(), self.step
+        if self.step < self.count - 1:
+            pygame.time.set_timer(STEP_EVENT, max(int(self.delay * 1000), FRAME_MS))
+        else:
+            self.stop()
+
+    def set_delay(self, delay):
+        self.delay = delay
+        self.seek(self.step)
+
+    def advance(self):
+        started, first = self.anchor
+        step = first + int((time.perf_counter() - started) / self.delay)
+        if step >= self.count - 1:
+            step = self.count - 1
+            self.stop()
+        self.step = step
+
+    def stop(self):
+        pygame.time.set_timer(STEP_EVENT, 0)
+
+
+def draw_timeline(surface, track, filled):
+    pygame.draw.rect(surface, GRAY, track)
+    pygame.draw.rect(surface, BLUE, (track[0], track[1], filled, track[3]))
+    pygame.draw.rect(surface, RED, (track[0] + max(filled - 2, 0), track[1], 4, track[3]))
+    pygame.draw.rect(surface, BLACK, track, 1)
+
+
+def animate_solution(solution, slider, time_solved, stats):
     btn_menu = Button((WINDOW_WIDTH - 110, PUZZLE_HEIGHT + 50, 100, 40), "Menu")
-    THUMB_SIZE = 30
-    THUMB_PUZZLE_WIDTH = THUMB_SIZE * 3
-    THUMB_PUZZLE_HEIGHT = THUMB_SIZE * 3
+    size = len(solution[0])
+    THUMB_SIZE = 90 // size
+    THUMB_PUZZLE_WIDTH = THUMB_SIZE * size
+    THUMB_PUZZLE_HEIGHT = THUMB_SIZE * size
     visible_count = 5
     scroll_index = 0
     btn_left = Button((WINDOW_WIDTH / 2 - 35, PUZZLE_HEIGHT + 270, 30, 30), "<")
     btn_right = Button((WINDOW_WIDTH / 2 + 5, PUZZLE_HEIGHT + 270, 30, 30), ">")
+    gap = 3
+    strip = (20, PUZZLE_HEIGHT + 160, visible_count * (THUMB_PUZZLE_WIDTH + gap), THUMB_PUZZLE_HEIGHT + 20)
+    track = (20, PUZZLE_HEIGHT + 120, WINDOW_WIDTH - 40, 16)  # the scrubbable timeline
+    last_scroll = max(len(solution) - visible_count, 0)
+    playback = Playback(len(solution), slider.value)
+    scrubbing = False
 
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-                return
-            if btn_menu.is_clicked(event):
-                return
-            slider.handle_event(event)
-            if btn_left.is_clicked(event):
-                scroll_index = max(scroll_index - 1, 0)
-            if btn_right.is_clicked(event):
-                if scroll_index + visible_count < len(solution):
-                    scroll_index += 1
-        delay = slider.value
-        screen.fill(WHITE)
-        draw_puzzle(screen, start_state, offset=LEFT_PUZZLE_OFFSET)
-        if i < len(solution):
-            draw_puzzle(screen, solution[i], offset=RIGHT_PUZZLE_OFFSET)
-        else:
-            draw_puzzle(screen, solution[-1], offset=RIGHT_PUZZLE_OFFSET)
-        info_text = f"Steps: {i}  Time: {time_solved:.1f}s"
-        info_surface = font_small.render(info_text, True, BLACK)
-        screen.blit(info_surface, (10, PUZZLE_HEIGHT + 70))
-        btn_menu.draw(screen)
-        slider.draw(screen)
-        slider_text = font_small.render(f"Delay: {slider.value:.3f}s", True, BLACK)
-        screen.blit(slider_text, (320, PUZZLE_AREA_HEIGHT + 250))
-        btn_left.draw(screen)
-        btn_right.draw(screen)
-        gap = 3
+    def draw_thumbnails(scroll_index, current):  # only the visible boards are drawn, however long the path
+        pygame.draw.rect(screen, WHITE, strip)
         for idx in range(visible_count):
             step_idx = scroll_index + idx
             if step_idx >= len(solution):
@@ -174,48 +238,91 @@ def animate_solution(solution, slider, time_solved):
             thumb_x = 20 + idx * (THUMB_PUZZLE_WIDTH + gap)
             thumb_y = PUZZLE_HEIGHT + 160
             draw_thumbnail(screen, solution[step_idx], (thumb_x, thumb_y), THUMB_SIZE)
+            if step_idx == current:
+                pygame.draw.rect(screen, RED, (thumb_x, thumb_y, THUMB_PUZZLE_WIDTH, THUMB_PUZZLE_HEIGHT), 2)
             step_text = font_small.render(str(step_idx), True, BLACK)
             text_rect = step_text.get_rect(center=(thumb_x + THUMB_PUZZLE_WIDTH // 2, thumb_y + THUMB_PUZZLE_HEIGHT + 10))
             screen.blit(step_text, text_rect)
 
-        pygame.display.flip()
-        if i < len(solution):
-            wait_start = time.time()
-            while time.time() - wait_start < delay:
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT:
-                        running = False
-                        return
-                    if btn_menu.is_clicked(event):
-                        return
-                    slider.handle_event(event)
-                    if btn_left.is_clicked(event):
-                        scroll_index = max(scroll_index - 1, 0)
-                    if btn_right.is_clicked(event):
-                        if scroll_index + visible_count < len(solution):
-                            scroll_index += 1
-                    delay = slider.value
-                clock.tick(60)
-            i += 1
-        else:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                if btn_menu.is_clicked(event):
-                    return
-                slider.handle_event(event)
-                if btn_left.is_clicked(event):
-                    scroll_index = max(scroll_index - 1, 0)
-                if btn_right.is_clicked(event):
-                    if scroll_index + visible_count < len(solution):
-                        scroll_index += 1
-            clock.tick(60)
+    def scrub_to(x):
+        ratio = min(max((x - track[0]) / track[2], 0), 1)
+        playback.seek(round(ratio * (len(solution) - 1)))
+
+    def follow(scroll_index):  # keeps the step on screen in the strip
+        if not scroll_index <= playback.step < scroll_index + visible_count:
+            scroll_index = min(playback.step, last_scroll)
+        return scroll_index
+
+    invalidate()
+    while True:
+        i = playback.step
+        refresh_puzzle(start_state, LEFT_PUZZLE_OFFSET)
+        refresh_puzzle(solution[i], RIGHT_PUZZLE_OFFSET)
+        info_text = f"Steps: {i}/{len(solution) - 1}  Time: {time_solved:.1f}s  Nodes: {stats.expanded}"
+        refresh_text(info_text, (10, PUZZLE_HEIGHT + 70, 375, 20))
+        filled = track[2] * i // max(len(solution) - 1, 1)
+        refresh(track, filled, draw_timeline, screen, track, filled)
+        btn_menu.refresh()
+        slider.refresh()
+        refresh_text(f"Delay: {slider.value:.3f}s", (320, PUZZLE_AREA_HEIGHT + 250, 170, 20))
+        btn_left.refresh()
+        btn_right.refresh()
+        current = i if scroll_index <= i < scroll_index + visible_count else None
+        refresh(strip, (scroll_index, current), draw_thumbnails, scroll_index, current)
+        present()
+
+        for event in [pygame.event.wait()] + pygame.event.get():  # sleeps until there is something to do
+            if event.type == pygame.QUIT:
+                playback.stop()
+                pygame.event.post(pygame.event.Event(pygame.QUIT))  # for the main loop, so the window closes
+                return
+            if btn_menu.is_clicked(event):
+                playback.stop()
+                return
+            if event.type == STEP_EVENT:
+                if not scrubbing:
+                    playback.advance()
+                    scroll_index = follow(scroll_index)
+                continue
+            slider.handle_event(event)
+            if slider.value != playback.delay:
+                playback.set_delay(slider.value)
+            if btn_left.is_clicked(event):
+                scroll_index = max(scroll_index - visible_count, 0)
+            elif btn_right.is_clicked(event):
+                scroll_index = min(scroll_index + visible_count, last_scroll)
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                if pygame.Rect(track).inflate(0, 8).collidepoint(event.pos):
+                    scrubbing = True
+                    scrub_to(event.pos[0])
+                    scroll_index = follow(scroll_index)
+                elif pygame.Rect(strip).collidepoint(event.pos):
+                    step_idx = scroll_index + (event.pos[0] - strip[0]) // (THUMB_PUZZLE_WIDTH + gap)
+                    if step_idx < len(solution):
+                        playback.seek(step_idx)
+            elif event.type == pygame.MOUSEMOTION and scrubbing:
+                scrub_to(event.pos[0])
+                scroll_index = follow(scroll_index)
+            elif event.type == pygame.MOUSEBUTTONUP and scrubbing:
+                scrubbing = False
+                playback.seek(playback.step)  # plays on from the scrubbed step
+            elif event.type == pygame.MOUSEWHEEL:
+                scroll_index = min(max(scroll_index - event.y, 0), last_scroll)
 
 
 def main():
-    global start_state
+    # The window is opened here, not at import, so solver processes that re-import
+    # this module (spawn start method) do not open windows of their own.
+    global start_state, screen, clock, font_large, font_small
+    pygame.init()
+    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    pygame.display.set_caption("8-Puzzle Solver")
+    clock = pygame.time.Clock()
+    font_large = pygame.font.Font(None, 36)
+    font_small = pygame.font.Font(None, 24)
     start_state = [[2, 6, 5], [8, 7, 0], [4, 3, 1]]
-    goal_state = [[1, 2, 3], [4, 5, 6], [7, 8, 0]]
+    size = 3
+    goal_state = make_goal(size)
     algo_selected = None
     time_solved = 0
     btn_bfs = Button((50, PUZZLE_AREA_HEIGHT + 20, 100, 40), "BFS")
@@ -228,62 +335,88 @@ def main():
     btn_hill_simp = Button((200, PUZZLE_AREA_HEIGHT + 120, 100, 40), "H_SIMP")
     btn_hill_step = Button((350, PUZZLE_AREA_HEIGHT + 120, 100, 40), "H_STEEP")
     btn_hill_stocha = Button((50, PUZZLE_AREA_HEIGHT + 170, 100, 40), "H_STOR")
+    btn_bi_bfs = Button((200, PUZZLE_AREA_HEIGHT + 170, 100, 40), "BI-BFS")
+    btn_bi_Astar = Button((350, PUZZLE_AREA_HEIGHT + 170, 100, 40), "BI-A*")
+    btn_ara_star = Button((80, 250, 100, 40), "ARA*")
     btn_random = Button((200, 250, 100, 40), "Random")
+    btn_size = Button((320, 250, 100, 40), "4x4")
+    btn_cancel = Button((200, PUZZLE_AREA_HEIGHT + 120, 100, 40), "Cancel")
     slider = Slider((50, PUZZLE_AREA_HEIGHT + 250, 250, 20), 0.01, 2.0, 1.0)
     running = True
     animating = False
     solution_solved = None
+    solving = None  # the BackgroundSolve in flight; the buttons wait for it
+    showing_progress = False
+    preview = None  # (ARA*'s best path so far, when its playback started)
+    invalidate()
     while running:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif solving is not None:
+                if btn_cancel.is_clicked(event):
+                    solving.poll()  # collects the last path ARA* sent
+                    solving.cancel()
+                    if solving.best is not None:  # ARA* stops at the best path so far
+                        solution_solved, time_solved = solving.best[0], solving.elapsed()
+                        stats_solved = SearchStats()
+                        stats_solved.expanded = solving.nodes.value
+                        animating = True
+                    solving = None
             elif btn_random.is_clicked(event):
-                lst = random.sample(range(9), 9)
-                start_state = [lst[i * 3 : (i + 1) * 3] for i in range(3)]
+                start_state = random_state(size=size)
+            elif btn_size.is_clicked(event):
+                btn_size.text = f"{size}x{size}"
+                size = 4 if size == 3 else 3
+                start_state = random_state(size=size)
+                goal_state = make_goal(size)
             elif btn_bfs.is_clicked(event):
                 algo_selected = "bfs"
-                solution_solved, time_solved = solution_time(start_state, "bfs")
-                animating = True
+                solving = BackgroundSolve(start_state, "bfs")
             elif btn_dfs.is_clicked(event):
                 algo_selected = "dfs"
-                solution_solved, time_solved = solution_time(start_state, "dfs")
-                animating = True
+                solving = BackgroundSolve(start_state, "dfs")
             elif btn_ucs.is_clicked(event):
                 algo_selected = "ucs"
-                solution_solved, time_solved = solution_time(start_state, "ucs")
-                animating = True
+                solving = BackgroundSolve(start_state, "ucs")
             elif btn_iddfs.is_clicked(event):
                 algo_selected = "iddfs"
-                solution_solved, time_solved = solution_time(start_state, "iddfs")
-                animating = True
+                solving = BackgroundSolve(start_state, "iddfs")
             elif btn_gbfs.is_clicked(event):
                 algo_selected = "gbfs"
-                solution_solved, time_solved = solution_time(start_state, "gbfs")
-                animating = True
+                solving = BackgroundSolve(start_state, "gbfs")
             elif btn_Astar.is_clicked(event):
                 algo_selected = "A*"
-                solution_solved, time_solved = solution_time(start_state, "A_star")
-                animating = True
+                solving = BackgroundSolve(start_state, "A_star")
             elif btn_ida_star.is_clicked(event):
                 algo_selected = "IDA*"
-                solution_solved, time_solved = solution_time(start_state, "ida_star")
-                animating = True
+                solving = BackgroundSolve(start_state, "ida_star")
             elif btn_hill_simp.is_clicked(event):
                 algo_selected = "HillClimbing_Simple"
-                solution_solved, time_solved = solution_time(start_state, "hill_simp")
-                animating = True
+                solving = BackgroundSolve(start_state, "hill_simp")
             elif btn_hill_step.is_clicked(event):
                 algo_selected = "HillClimbing_Steepest"
-                solution_solved, time_solved = solution_time(start_state, "hill_steepest")
-                animating = True
+                solving = BackgroundSolve(start_state, "hill_steepest")
             elif btn_hill_stocha.is_clicked(event):
                 algo_selected = "HillClimbing_Stochastic"
-                solution_solved, time_solved = solution_time(start_state, "hill_stochastic")
-                animating = True
+                solving = BackgroundSolve(start_state, "hill_stochastic")
+            elif btn_bi_bfs.is_clicked(event):
+                algo_selected = "Bidirectional_BFS"
+                solving = BackgroundSolve(start_state, "bidirectional_bfs")
+            elif btn_bi_Astar.is_clicked(event):
+                algo_selected = "Bidirectional_A*"
+                solving = BackgroundSolve(start_state, "bidirectional_A_star")
+            elif btn_ara_star.is_clicked(event):
+                algo_selected = "ARA*"
+                solving = BackgroundSolve(start_state, "ara_star")
             slider.handle_event(event)
+        if solving is not None and solving.poll() is not None:
+            solution_solved, time_solved, stats_solved = solving.result
+            solving = None
+            animating = True
         if animating:
             if solution_solved:
-                animate_solution(solution_solved, slider, time_solved)
+                animate_solution(solution_solved, slider, time_solved, stats_solved)
             else:
                 screen.fill(WHITE)
                 draw_puzzle(screen, start_state, offset=CENTER_PUZZLE_OFFSET)
@@ -292,33 +425,58 @@ def main():
                 pygame.display.flip()
                 time.sleep(2)
             animating = False
+            invalidate()
 
-        screen.fill(WHITE)
-        draw_puzzle(screen, start_state, offset=LEFT_PUZZLE_OFFSET)
-        left_text = font_small.render("start state", True, BLACK)
-        screen.blit(left_text, LEFT_TEXT)
-        draw_puzzle(screen, goal_state, offset=RIGHT_PUZZLE_OFFSET)
-        right_text = font_small.render("goal state", True, BLACK)
-        screen.blit(right_text, RIGHT_TEXT)
-        btn_bfs.draw(screen)
-        btn_dfs.draw(screen)
-        btn_ucs.draw(screen)
-        btn_iddfs.draw(screen)
-        btn_gbfs.draw(screen)
-        btn_Astar.draw(screen)
-        btn_ida_star.draw(screen)
-        btn_hill_simp.draw(screen)
-        btn_hill_step.draw(screen)
-        btn_hill_stocha.draw(screen)
-        btn_random.draw(screen)
-        slider.draw(screen)
-        slider_text = font_small.render(f"Delay: {slider.value:.1f}s", True, BLACK)
-        screen.blit(slider_text, (320, PUZZLE_AREA_HEIGHT + 250))
+        if (solving is not None) != showing_progress:  # the button panel changes wholesale
+            showing_progress = solving is not None
+            invalidate()
+        refresh_puzzle(start_state, LEFT_PUZZLE_OFFSET)
+        refresh_text("start state", LEFT_TEXT + (100, 20))
+        if solving is not None and solving.best is not None:  # ARA*'s best path so far, restarted with each shorter one
+            if preview is None or preview[0] is not solving.best[0]:
+                preview = solving.best[0], time.perf_counter()
+            path = preview[0]
+            step = int((time.perf_counter() - preview[1]) / slider.value) % len(path)
+            refresh_puzzle(path[step], RIGHT_PUZZLE_OFFSET)
+            refresh_text(f"best {step}/{len(path) - 1}", RIGHT_TEXT + (100, 20))
+        else:
+            preview = None
+            refresh_puzzle(goal_state, RIGHT_PUZZLE_OFFSET)
+            refresh_text("goal state", RIGHT_TEXT + (100, 20))
+        if solving is not None:
+            progress = f"Nodes: {solving.nodes.value}  Time: {solving.elapsed():.1f}s"
+            if solving.bound.value >= 0:
+                progress += f"  Bound: {solving.bound.value:g}"
+            if solving.best is not None:
+                progress += f"  Best: {len(solving.best[0]) - 1} (x{solving.best[1]:.2f})"
+            refresh_text(progress, (50, PUZZLE_AREA_HEIGHT + 40, 400, 20))
+            btn_cancel.refresh()
+        else:
+            btn_bfs.refresh()
+            btn_dfs.refresh()
+            btn_ucs.refresh()
+            btn_iddfs.refresh()
+            btn_gbfs.refresh()
+            btn_Astar.refresh()
+            btn_ida_star.refresh()
+            btn_hill_simp.refresh()
+            btn_hill_step.refresh()
+            btn_hill_stocha.refresh()
+            btn_bi_bfs.refresh()
+            btn_bi_Astar.refresh()
+            btn_ara_star.refresh()
+        btn_random.refresh()
+        btn_size.refresh()
+        slider.refresh()
+        slider_text = f"Delay: {slider.value:.1f}s"
+        refresh_text(slider_text, (320, PUZZLE_AREA_HEIGHT + 250, 170, 20))
         if algo_selected:
-            algo_text = font_small.render(f"Algo: {algo_selected}", True, BLACK)
-            screen.blit(algo_text, (50, PUZZLE_AREA_HEIGHT))
-        pygame.display.flip()
+            algo_text = f"Algo: {algo_selected}"
+            refresh_text(algo_text, (50, PUZZLE_AREA_HEIGHT, 400, 20))
+        present()
         clock.tick(60)
+    if solving is not None:
+        solving.cancel()
     pygame.quit()
 
 